@@ -3,13 +3,10 @@ import os
 import json
 import logging
 import time
-from google.cloud import texttospeech
-from moviepy.editor import *
-from PIL import Image, ImageDraw, ImageFont
-import numpy as np
-import tempfile
-import requests
-from io import BytesIO
+from jobs import CANCELADO, COMPLETADO, EN_CURSO, ERROR, PENDIENTE, JobManager
+from profiles import PERFIL_PREDETERMINADO, PERFILES_RENDER
+from results import ResultStore
+from video import VOCES_DISPONIBLES
 
 logging.basicConfig(level=logging.INFO)
 
@@ -24,281 +21,138 @@ except Exception as e:
     st.error(f"Error al cargar las credenciales de GCP: {e}")
     st.stop()
 
-# Configuración de voces
-VOCES_DISPONIBLES = {
-    'es-ES-Standard-B': texttospeech.SsmlVoiceGender.MALE,
-}
 
-# Función de creación de texto con fondo
-def create_text_image(text, video_width, video_height, font_size=None, line_height=None, bg_color=(0, 0, 0, 150), text_color="white", padding=None, bottom_margin=None):
-    """
-    Crea una imagen con texto y un fondo oscuro transparente, optimizada para la parte inferior del video.
-    El fondo ahora cubre todo el bloque de texto.
-    """
-    import textwrap
-
-    # Define valores predeterminados basados en la resolución del video
-    if font_size is None:
-        font_size = int(video_height * 0.05)  # 5% de la altura del video
-    if line_height is None:
-        line_height = int(font_size * 1.2)  # 120% del tamaño de la fuente
-    if padding is None:
-        padding = int(video_height * 0.01)  # 1% de la altura del video
-    if bottom_margin is None:
-        bottom_margin = int(video_height * 0.02)  # 2% de la altura del video
-
-    wrapped_text = textwrap.fill(text, width=60)  # Ancho máximo de la línea
-    lines = wrapped_text.split('\n')
-    num_lines = len(lines)
-
-    # Calcula la altura total requerida para el texto
-    total_text_height = num_lines * line_height
-    image_height = total_text_height + 2 * padding + bottom_margin
-
-    img = Image.new('RGBA', (video_width, image_height), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", font_size)
-
-    # Calcula el ancho máximo de todas las líneas (para centrar el rectángulo)
-    max_line_width = 0
-    for line in lines:
-        left, top, right, bottom = draw.textbbox((0, 0), line, font=font)
-        max_line_width = max(max_line_width, right - left)
+@st.cache_resource
+def get_result_store():
+    # Videos terminados en memoria, compartidos por todas las sesiones
+    return ResultStore()
 
-    # Calcula las coordenadas del rectángulo de fondo
-    rect_x0 = (video_width - max_line_width) // 2 - padding
-    rect_y0 = padding  # Comienza desde el padding superior
-    rect_x1 = rect_x0 + max_line_width + 2 * padding
-    rect_y1 = image_height - bottom_margin - padding # Termina antes del margen inferior
 
-    # Dibuja el rectángulo de fondo *antes* de dibujar el texto
-    draw.rectangle((rect_x0, rect_y0, rect_x1, rect_y1), fill=bg_color)
+@st.cache_resource
+def get_job_manager():
+    # Un único pool de renders por proceso de Streamlit, compartido por todas las sesiones
+    # La limpieza periódica también libera los resultados en memoria que caducaron sin volver a leerse
+    result_store = get_result_store()
+    return JobManager(on_purge=result_store.discard, on_cleanup=result_store.purge)
 
-    # Dibuja el texto línea por línea
-    y = padding # Comienza desde el padding superior
-    for line in lines:
-        left, top, right, bottom = draw.textbbox((0, 0), line, font=font)
-        x = (img.width - (right - left)) // 2
-        draw.text((x, y), line, font=font, fill=text_color)
-        y += line_height
 
-    return np.array(img)
-
-# Función de creación de video (sin cambios significativos, solo llamada a create_text_image modificada)
-def create_simple_video(texto, nombre_salida, voz, background_video_path):
-    archivos_temp = []
-    clips_audio = []
-    clips_finales = []
-    success = False
-    message = ""
-    temp_video_path = None
-
-    try:
-        logging.info("Iniciando proceso de creación de video...")
-        frases = [f.strip() + "." for f in texto.split('.') if f.strip()]
-        client = texttospeech.TextToSpeechClient()
-
-        tiempo_acumulado = 0
-
-        # Agrupamos frases en segmentos
-        segmentos_texto = []
-        segmento_actual = ""
-        for frase in frases:
-            if len(segmento_actual) + len(frase) < 250:  # Reducido a 250
-                segmento_actual += " " + frase
-            else:
-                segmentos_texto.append(segmento_actual.strip())
-                segmento_actual = frase
-        segmentos_texto.append(segmento_actual.strip())
-
-        # Cargar video de fondo
+def show_profile(manager, job):
+    """
+    Panel con el resumen del perfil de un render: tiempo por etapa, contadores y memoria.
+    """
+    perfil = job["perfil"]
+    if not perfil:
+        return
+    with st.expander("Perfil del render"):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Duración total", f"{perfil['duracion']:.1f} s")
+        col2.metric("Pico de memoria", f"{perfil['pico_rss_mb']:.0f} MB")
+        col3.metric("Pico de memoria de ffmpeg", f"{perfil['pico_rss_subprocesos_mb']:.0f} MB")
+
+        st.table([{"Etapa": etapa, "Segundos": segundos, "%": round(100 * segundos / perfil["duracion"], 1)}
+                  for etapa, segundos in perfil["etapas"].items()])
+        if perfil["tiempos"]:
+            st.caption("Tiempo acumulado por operación (s)")
+            st.json(perfil["tiempos"])
+        if perfil["contadores"]:
+            st.caption("Contadores")
+            st.json(perfil["contadores"])
+
+        # Traza en formato Trace Event, para abrirla en chrome://tracing o Perfetto
+        ruta_traza = os.path.join(manager.store.job_dir(job["id"]), "traza_chrome.json")
+        if os.path.exists(ruta_traza):
+            with open(ruta_traza, "rb") as f:
+                st.download_button("Descargar traza (Chrome)", data=f.read(),
+                                   file_name=f"traza_{job['id']}.json", mime="application/json")
+
+
+def show_job(manager, job_id):
+    """
+    Muestra el estado de un trabajo; mientras no termina vuelve a ejecutar el script cada segundo.
+    """
+    job = manager.get(job_id)
+    if job is None:
+        st.session_state.pop("job_id", None)
+        return
+
+    if job["estado"] in (PENDIENTE, EN_CURSO):
+        if job["estado"] == PENDIENTE:
+            st.info("Video en cola, esperando un hueco para renderizar...")
+        else:
+            st.info("Generando video...")
+        if job["segmentos_totales"]:
+            st.progress(job["segmentos_sintetizados"] / job["segmentos_totales"],
+                        text=f"Audio: {job['segmentos_sintetizados']}/{job['segmentos_totales']} segmentos")
+        if job["fotogramas_totales"]:
+            st.progress(min(1.0, job["fotogramas_codificados"] / job["fotogramas_totales"]),
+                        text=f"Video: {job['fotogramas_codificados']}/{job['fotogramas_totales']} fotogramas")
+        if st.button("Cancelar"):
+            manager.cancel(job_id)
+        time.sleep(1)
+        st.rerun()
+
+    elif job["estado"] == COMPLETADO:
+        st.success(job["mensaje"])
         try:
-            logging.info(f"Intentando cargar video de fondo desde: {background_video_path}")
-            background_clip = VideoFileClip(background_video_path, audio=False)
-            logging.info("Video de fondo cargado exitosamente.")
-            video_width, video_height = background_clip.size  # Obtener dimensiones del video
-            logging.info(f"Ancho del video: {video_width}, Alto del video: {video_height}") # Imprime la resolución
-        except Exception as e:
-            message = f"Error al cargar el video de fondo: {e}"
-            logging.error(message)
-            return False, message, None
-
-        for i, segmento in enumerate(segmentos_texto):
-            logging.info(f"Procesando segmento {i + 1} de {len(segmentos_texto)}")
-
-            synthesis_input = texttospeech.SynthesisInput(text=segmento)
-            voice = texttospeech.VoiceSelectionParams(
-                language_code="es-ES",
-                name=voz,
-                ssml_gender=VOCES_DISPONIBLES[voz]
-            )
-            audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3
+            # El mismo objeto bytes, retenido entre reruns, sirve para mostrar y para descargar
+            video_bytes = get_result_store().get(job["resultado"])
+
+            # Mostrar el video usando st.video
+            st.video(video_bytes)
+
+            # Descargar el video usando st.download_button
+            st.download_button(
+                label="Descargar video",
+                data=video_bytes,
+                file_name=f"{job['params']['nombre_salida']}.mp4",
+                mime="video/mp4"
             )
+        except Exception as e:
+            st.error(f"Error al mostrar/descargar el video: {e}")
+        show_profile(manager, job)
 
-            retry_count = 0
-            max_retries = 3
-
-            while retry_count <= max_retries:
-                try:
-                    response = client.synthesize_speech(
-                        input=synthesis_input,
-                        voice=voice,
-                        audio_config=audio_config
-                    )
-                    break
-                except Exception as e:
-                    logging.error(f"Error al solicitar audio (intento {retry_count + 1}): {str(e)}")
-                    if "429" in str(e):
-                        retry_count += 1
-                        time.sleep(2 ** retry_count)
-                    else:
-                        raise
-
-            if retry_count > max_retries:
-                raise Exception("Maximos intentos de reintento alcanzado")
-
-            temp_filename = f"temp_audio_{i}.mp3"
-            archivos_temp.append(temp_filename)
-            with open(temp_filename, "wb") as out:
-                out.write(response.audio_content)
-
-            audio_clip = AudioFileClip(temp_filename)
-            clips_audio.append(audio_clip)
-            duracion = audio_clip.duration
-
-            # Usar la función create_text_image modificada, pasando video_width y video_height
-            text_img = create_text_image(segmento, video_width=video_width, video_height=video_height)
-            txt_clip = (ImageClip(text_img, transparent=True)
-                        .set_start(tiempo_acumulado)
-                        .set_duration(duracion)
-                        .set_pos(("center", "bottom")))
-
-            video_segment = txt_clip.set_audio(audio_clip.set_start(tiempo_acumulado))
-            clips_finales.append(video_segment)
-
-            tiempo_acumulado += duracion
-            time.sleep(0.2)
-
-        # Calcular la duración total del video
-        video_duration = tiempo_acumulado
-
-        # Calcular cuántas veces necesitamos repetir el clip de fondo
-        num_loops = int(video_duration / background_clip.duration) + 1
-
-        # Crear una lista de clips de fondo repetidos
-        background_clips = [background_clip] * num_loops
-
-        # Concatenar los clips de fondo
-        background_clip_repeated = concatenate_videoclips(background_clips, method="compose")
-
-        # Ajustar el clip de fondo para que coincida con la duración total del video
-        background_clip = background_clip_repeated.subclip(0, video_duration)
-
-        # Superponer los clips de texto sobre el fondo
-        final_video_with_background = CompositeVideoClip([background_clip] + clips_finales)
-
-        # Generar el video en un archivo temporal
-        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as temp_video_file:
-            temp_video_path = temp_video_file.name
-            logging.info(f"Escribiendo video a archivo temporal: {temp_video_path}")
-            final_video_with_background.write_videofile(
-                temp_video_path,
-                fps=24,
-                codec='libx264',
-                audio_codec='aac',
-                preset='ultrafast',
-                threads=4
-            )
-            logging.info("Video escrito exitosamente al archivo temporal.")
-
-        success = True
-        message = "Video generado exitosamente"
-
-    except Exception as e:
-        message = str(e)
-        logging.error(f"Error: {message}")
-        success = False
-
-    finally:
-        for clip in clips_audio:
-            try:
-                clip.close()
-            except:
-                pass
-
-        for clip in clips_finales:
-            try:
-                clip.close()
-            except:
-                pass
-
-        try:
-            background_clip.close()
-            background_clip_repeated.close()
-        except:
-            pass
-
-        for temp_file in archivos_temp:
-            try:
-                if os.path.exists(temp_file):
-                    os.close(os.open(temp_file, os.O_RDONLY))
-                    os.remove(temp_file)
-            except:
-                pass
+    elif job["estado"] == ERROR:
+        st.error(f"Error al generar video: {job['mensaje']}")
+        show_profile(manager, job)
 
-        return success, message, temp_video_path
+    elif job["estado"] == CANCELADO:
+        st.warning("Generación de video cancelada")
 
 
 def main():
     st.title("Creador de Videos Automático")
+    manager = get_job_manager()
+
+    # El id del trabajo se guarda en la sesión y en la URL para sobrevivir a los reruns y recargas
+    if "job_id" not in st.session_state and "job" in st.query_params:
+        st.session_state["job_id"] = st.query_params["job"]
 
     uploaded_file = st.file_uploader("Carga un archivo de texto", type="txt")
     voz_seleccionada = st.selectbox("Selecciona la voz", options=list(VOCES_DISPONIBLES.keys()))
     background_video = st.file_uploader("Carga un video de fondo (MP4)", type=["mp4"])
+    perfil = st.selectbox(
+        "Calidad del render",
+        options=list(PERFILES_RENDER.keys()),
+        index=list(PERFILES_RENDER.keys()).index(PERFIL_PREDETERMINADO),
+        format_func=lambda nombre: {"draft": "Borrador (rápido, 480p)",
+                                    "standard": "Estándar (hasta 1080p)",
+                                    "archive": "Archivo (resolución original, máxima calidad)"}[nombre]
+    )
 
     if uploaded_file and background_video:
         texto = uploaded_file.read().decode("utf-8")
         nombre_salida = st.text_input("Nombre del Video (sin extensión)", "video_generado")
 
-        # Guardar el video de fondo temporalmente
-        try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                background_video_path = os.path.join(temp_dir, "background.mp4")
-                with open(background_video_path, "wb") as f:
-                    f.write(background_video.read())
-
-                if st.button("Generar Video"):
-                    with st.spinner('Generando video...'):
-                        success, message, temp_video_path = create_simple_video(texto, nombre_salida, voz_seleccionada, background_video_path)
-                        if success:
-                            st.success(message)
-                            try:
-                                # Leer el archivo temporal en memoria
-                                with open(temp_video_path, 'rb') as file:
-                                    video_bytes = file.read()
-
-                                # Mostrar el video usando st.video
-                                st.video(video_bytes)
-
-                                # Descargar el video usando st.download_button
-                                st.download_button(
-                                    label="Descargar video",
-                                    data=video_bytes,
-                                    file_name=f"{nombre_salida}.mp4",
-                                    mime="video/mp4"
-                                )
-
-                            except Exception as e:
-                                st.error(f"Error al mostrar/descargar el video: {e}")
-                            finally:
-                                if temp_video_path:
-                                    os.remove(temp_video_path)
-                        else:
-                            st.error(f"Error al generar video: {message}")
-
-        except Exception as e:
-            st.error(f"Error al procesar el video: {e}")
+        if st.button("Generar Video"):
+            try:
+                job_id = manager.submit(texto, nombre_salida, voz_seleccionada, background_video, profile=perfil)
+                st.session_state["job_id"] = job_id
+                st.query_params["job"] = job_id
+            except Exception as e:
+                st.error(f"Error al procesar el video: {e}")
+
+    if "job_id" in st.session_state:
+        show_job(manager, st.session_state["job_id"])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,105 @@
+import io
+import wave
+
+import numpy as np
+from moviepy.editor import AudioClip
+
+FRECUENCIA_MUESTREO = 24000  # Hz pedidos a la API en LINEAR16
+
+
+def decode_linear16(audio_content, sample_rate=FRECUENCIA_MUESTREO):
+    """
+    Devuelve (muestras int16 de forma (n, canales), frecuencia) sin lanzar ningún decodificador:
+    la API entrega LINEAR16 con una cabecera WAV, así que basta con leer la cabecera.
+    Si no hay cabecera se interpreta como PCM mono crudo a `sample_rate`.
+    """
+    if audio_content[:4] == b"RIFF":
+        with wave.open(io.BytesIO(audio_content)) as wav:
+            canales = wav.getnchannels()
+            sample_rate = wav.getframerate()
+            datos = wav.readframes(wav.getnframes())
+    else:
+        canales = 1
+        datos = audio_content
+    muestras = np.frombuffer(datos, dtype="<i2")
+    return muestras[:len(muestras) // canales * canales].reshape(-1, canales), sample_rate
+
+
+def linear16_duration(audio_content, sample_rate=FRECUENCIA_MUESTREO):
+    """Duración en segundos calculada a partir del número de muestras."""
+    muestras, sample_rate = decode_linear16(audio_content, sample_rate)
+    return len(muestras) / sample_rate
+
+
+def stereo_output_args(channels):
+    """
+    Argumentos de ffmpeg para sacar en estéreo una entrada PCM de `channels` canales, como la
+    pista de render_moviepy. El mono se duplica tal cual en los dos canales: con "-ac 2"
+    ffmpeg lo repartiría a -3 dB en cada uno y el audio saldría más bajo.
+    """
+    if channels == 1:
+        return ["-af", "pan=stereo|c0=c0|c1=c0"]
+    return ["-ac", "2"]
+
+
+class AudioTrack:
+    """
+    Pista de audio completa en un único búfer int16 preasignado.
+    Se entrega al codificador como una sola pista, sin archivos temporales por segmento.
+    """
+
+    def __init__(self, samples, fps=FRECUENCIA_MUESTREO):
+        self.samples = samples
+        self.fps = fps
+
+    @property
+    def nchannels(self):
+        return self.samples.shape[1]
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.fps
+
+    @classmethod
+    def from_segments(cls, segmentos_pcm, fps=FRECUENCIA_MUESTREO):
+        """
+        Concatena los segmentos (arrays int16 de forma (n, canales)) en un búfer preasignado.
+        Devuelve la pista y la duración de cada segmento.
+        """
+        canales = max((s.shape[1] for s in segmentos_pcm), default=1)
+        total = sum(len(s) for s in segmentos_pcm)
+        samples = np.zeros((total, canales), dtype=np.int16)
+        posicion = 0
+        duraciones = []
+        for segmento in segmentos_pcm:
+            samples[posicion:posicion + len(segmento)] = segmento  # Difunde mono a estéreo si hace falta
+            posicion += len(segmento)
+            duraciones.append(len(segmento) / fps)
+        return cls(samples, fps), duraciones
+
+    def to_clip(self):
+        """
+        AudioClip de moviepy que lee directamente del búfer int16; solo se convierte a
+        flotante el bloque que el escritor pide en cada momento. Siempre es estéreo,
+        como los AudioFileClip que se usaban antes.
+        No remuestrea: hay que escribirlo a su propia frecuencia (audio_fps=self.fps) para
+        que cada instante pedido caiga exactamente en una muestra.
+        """
+        samples = self.samples
+        fps = self.fps
+
+        def make_frame(t):
+            if np.isscalar(t):
+                return make_frame(np.array([t]))[0]
+            # Redondeo y no truncado: t * fps da p. ej. 2.9999999 para la muestra 3
+            indices = np.rint(t * fps).astype(int)
+            validos = (indices >= 0) & (indices < len(samples))
+            bloque = np.zeros(indices.shape + (2,), dtype=np.float32)
+            bloque[validos] = samples[indices[validos]] / 32768.0
+            return bloque
+
+        return AudioClip(make_frame, duration=self.duration, fps=fps)
+
+    def to_bytes(self):
+        """Vista de bytes s16le entrelazados, sin copiar, para alimentar a ffmpeg por stdin."""
+        return memoryview(np.ascontiguousarray(self.samples)).cast("B")
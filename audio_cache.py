@@ -0,0 +1,141 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Configuración predeterminada de la caché de audio
+DIRECTORIO_CACHE = os.environ.get("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tts_audio_cache"))
+TAMANO_MAXIMO_CACHE = 500 * 1024 * 1024  # 500 MB
+
+
+class AudioCache:
+    """
+    Caché en disco, direccionada por contenido, para los segmentos de audio sintetizados.
+    Cada entrada guarda los bytes del audio y su duración decodificada; se expulsan
+    las entradas menos usadas recientemente (LRU) cuando se supera `max_bytes`.
+    El límite es del directorio, no del proceso: antes de expulsar se vuelve a contar lo
+    que han escrito los demás procesos que lo comparten (p. ej. los workers de render).
+    """
+
+    def __init__(self, directory=DIRECTORIO_CACHE, max_bytes=TAMANO_MAXIMO_CACHE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> tamaño en bytes, de menos a más reciente
+        self._total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._cargar_indice()
+
+    @staticmethod
+    def key(texto, voice, audio_config):
+        """
+        Calcula la clave de un segmento a partir del texto, la voz, el idioma y el AudioConfig.
+        """
+        h = hashlib.sha256()
+        for parte in (texto, voice.name, voice.language_code):
+            h.update(parte.encode("utf-8"))
+            h.update(b"\0")
+        h.update(type(audio_config).serialize(audio_config))
+        return h.hexdigest()
+
+    def _rutas(self, clave):
+        base = os.path.join(self.directory, clave)
+        return base + ".audio", base + ".json"
+
+    def _cargar_indice(self):
+        # Reconstruye el orden LRU a partir de la fecha de modificación de cada entrada
+        self._entradas.clear()
+        self._total_bytes = 0
+        encontradas = []
+        for nombre in os.listdir(self.directory):
+            if not nombre.endswith(".audio"):
+                continue
+            clave = nombre[:-len(".audio")]
+            ruta_audio, ruta_meta = self._rutas(clave)
+            try:
+                estado = os.stat(ruta_audio)
+                if not os.path.exists(ruta_meta):
+                    continue
+            except OSError:
+                continue  # Otro proceso la expulsó entre la lista y la lectura
+            encontradas.append((estado.st_mtime, clave, estado.st_size))
+        for _, clave, tamano in sorted(encontradas):
+            self._entradas[clave] = tamano
+            self._total_bytes += tamano
+
+    def get(self, clave):
+        """
+        Devuelve (audio_bytes, duracion) o None si el segmento no está en caché.
+        """
+        ruta_audio, ruta_meta = self._rutas(clave)
+        with self._lock:
+            if not (os.path.exists(ruta_audio) and os.path.exists(ruta_meta)):
+                # Puede haberla expulsado otro proceso que comparte el directorio
+                self._total_bytes -= self._entradas.pop(clave, 0)
+                self.misses += 1
+                return None
+            if clave not in self._entradas:
+                # Puede haberla escrito otro proceso que comparte el directorio (p. ej. otro worker)
+                tamano = os.path.getsize(ruta_audio)
+                self._entradas[clave] = tamano
+                self._total_bytes += tamano
+            try:
+                with open(ruta_meta) as f:
+                    duracion = json.load(f)["duracion"]
+                with open(ruta_audio, "rb") as f:
+                    audio = f.read()
+                os.utime(ruta_audio)  # Marca la entrada como usada recientemente
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Entrada de caché corrupta {clave}: {e}")
+                self._eliminar(clave)
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.hits += 1
+            return audio, duracion
+
+    def put(self, clave, audio, duracion):
+        ruta_audio, ruta_meta = self._rutas(clave)
+        with self._lock:
+            if clave in self._entradas:
+                self._eliminar(clave)
+            # Escritura atómica: primero a un temporal y luego se renombra
+            for ruta, datos, modo in ((ruta_meta, json.dumps({"duracion": duracion}), "w"),
+                                      (ruta_audio, audio, "wb")):
+                temporal = f"{ruta}.{os.getpid()}.tmp"
+                with open(temporal, modo) as f:
+                    f.write(datos)
+                os.replace(temporal, ruta)
+            self._entradas[clave] = len(audio)
+            self._total_bytes += len(audio)
+            self._expulsar()
+
+    def _eliminar(self, clave):
+        self._total_bytes -= self._entradas.pop(clave, 0)
+        for ruta in self._rutas(clave):
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+    def _expulsar(self):
+        # Cada proceso solo sabe lo que ha escrito él; sin recontar, el límite sería por worker
+        self._cargar_indice()
+        while self._total_bytes > self.max_bytes and self._entradas:
+            clave = next(iter(self._entradas))
+            logging.info(f"Expulsando segmento de la caché de audio: {clave}")
+            self._eliminar(clave)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entradas": len(self._entradas),
+                "bytes": self._total_bytes,
+            }
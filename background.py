@@ -0,0 +1,116 @@
+import logging
+
+import numpy as np
+from moviepy.editor import VideoClip
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+
+from profiles import target_size
+
+MEMORIA_MAXIMA_FONDO = 256 * 1024 * 1024  # Bytes de fotogramas decodificados que se pueden retener
+
+
+class LoopingBackgroundClip(VideoClip):
+    """
+    Fondo que se repite en bucle sin concatenar copias del clip.
+
+    El tiempo de salida t se corresponde con t % duración del fondo. Si todos los fotogramas
+    decodificados caben en `max_cache_bytes` se guardan en un búfer y el fondo se decodifica
+    una sola vez; si no, se usa un único lector que solo avanza y que, al llegar al punto de
+    bucle, se reabre desde el principio en lugar de buscar hacia atrás.
+
+    Con `max_height`, ffmpeg reduce el fondo al decodificarlo, así que todo lo que viene
+    después (búfer, composición, codificación) trabaja ya a la resolución de salida.
+    """
+
+    def __init__(self, filename, duration=None, max_cache_bytes=MEMORIA_MAXIMA_FONDO, max_height=None):
+        VideoClip.__init__(self, has_constant_size=True)
+        self.filename = filename
+        self.reader = FFMPEG_VideoReader(filename)
+        self.source_size = tuple(self.reader.size)
+        ancho, alto = target_size(self.source_size, max_height)
+        if (ancho, alto) != self.source_size:
+            logging.info(f"Fondo reducido al decodificar: {self.source_size[0]}x{self.source_size[1]} -> {ancho}x{alto}")
+            self.reader.close()
+            self.reader = FFMPEG_VideoReader(filename, target_resolution=(alto, ancho))
+        self.fps = self.reader.fps
+        self.size = tuple(self.reader.size)
+        self.loop_duration = self.reader.duration
+        self.nframes = max(1, self.reader.nframes)
+        self.reopens = 0  # Veces que el lector volvió al principio
+
+        ancho, alto = self.size
+        bytes_necesarios = self.nframes * ancho * alto * 3
+        self._frames = None
+        if bytes_necesarios <= max_cache_bytes:
+            logging.info(f"Fondo en memoria: {self.nframes} fotogramas ({bytes_necesarios / 2 ** 20:.1f} MB)")
+            self._frames = np.empty((self.nframes, alto, ancho, 3), dtype=np.uint8)
+        else:
+            logging.info(f"Fondo demasiado largo para la memoria ({bytes_necesarios / 2 ** 20:.1f} MB); "
+                         "se decodifica en streaming")
+
+        # Al abrirse, el lector ya ha decodificado el primer fotograma
+        self._ultimo_indice = 0
+        self._ultimo_frame = self.reader.lastread
+        self._siguiente = 1  # Índice del próximo fotograma que entregará el lector
+        if self._frames is not None:
+            self._frames[0] = self.reader.lastread
+            self._ultimo_frame = None  # En memoria se entregan siempre vistas del búfer
+
+        self.make_frame = self._make_frame
+        self.duration = duration
+        self.end = duration
+
+    @property
+    def in_memory(self):
+        """True si todos los fotogramas del fondo se retienen en memoria."""
+        return self._frames is not None
+
+    def _indice(self, t):
+        # Mismo redondeo que FFMPEG_VideoReader.get_frame
+        return min(int(self.fps * (t % self.loop_duration) + 0.00001), self.nframes - 1)
+
+    def _make_frame(self, t):
+        indice = self._indice(t)
+        if self._frames is not None:
+            return self._frame_en_memoria(indice)
+        return self._frame_en_streaming(indice)
+
+    def _frame_en_memoria(self, indice):
+        if indice == self._ultimo_indice and self._ultimo_frame is not None:
+            # Mismo objeto para el mismo fotograma: el compositor puede reutilizar su resultado
+            return self._ultimo_frame
+        # Decodifica hacia delante hasta el índice pedido; cada fotograma se decodifica una vez
+        while self._siguiente <= indice:
+            self._frames[self._siguiente] = self.reader.read_frame()
+            self._siguiente += 1
+            if self._siguiente == self.nframes:
+                # Ya está todo en memoria: el lector no vuelve a hacer falta
+                self.reader.close()
+        frame = self._frames[indice]
+        # Vista de solo lectura: quien componga encima debe copiarla, no modificar el búfer
+        frame.flags.writeable = False
+        self._ultimo_indice = indice
+        self._ultimo_frame = frame
+        return frame
+
+    def _frame_en_streaming(self, indice):
+        if indice == self._ultimo_indice:
+            return self._ultimo_frame
+        if indice < self._siguiente:
+            # Punto de bucle: reabrir desde el principio es más barato que buscar hacia atrás
+            self.reader.initialize(0)
+            self._siguiente = 0
+            self.reopens += 1
+        if indice > self._siguiente:
+            self.reader.skip_frames(indice - self._siguiente)
+        self._ultimo_frame = self.reader.read_frame()
+        self._ultimo_indice = indice
+        self._siguiente = indice + 1
+        self.reader.pos = self._siguiente
+        return self._ultimo_frame
+
+    def close(self):
+        if self.reader:
+            self.reader.close()
+            self.reader = None
+        self._frames = None
@@ -0,0 +1,78 @@
+"""
+Benchmark del fondo en bucle: concatenate_videoclips(..., method="compose") + subclip
+frente a LoopingBackgroundClip, con fondos sintéticos de 2 s, 30 s y 5 min.
+Cada salida dura lo que el fondo más `--extra` segundos, así siempre cruza un punto de bucle.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_background --ancho 640 --alto 360 --memoria-mb 256
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from moviepy.config import get_setting
+from moviepy.editor import VideoFileClip, concatenate_videoclips
+
+from background import LoopingBackgroundClip
+
+DURACIONES_FONDO = (2, 30, 300)
+FPS_SALIDA = 24
+
+
+def generar_fondo(directorio, duracion, ancho, alto):
+    ruta = os.path.join(directorio, f"fondo_{duracion}s.mp4")
+    subprocess.run([get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", f"testsrc=size={ancho}x{alto}:rate=30:duration={duracion}",
+                    "-pix_fmt", "yuv420p", "-preset", "ultrafast", ruta], check=True)
+    return ruta
+
+
+def recorrer(clip, duracion):
+    tiempos = np.arange(0, duracion, 1 / FPS_SALIDA)
+    inicio = time.perf_counter()
+    for t in tiempos:
+        clip.get_frame(t)
+    return len(tiempos) / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ancho", type=int, default=640)
+    parser.add_argument("--alto", type=int, default=360)
+    parser.add_argument("--extra", type=float, default=30)
+    parser.add_argument("--memoria-mb", type=float, default=256)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="bench_fondo_")
+    try:
+        for duracion_fondo in DURACIONES_FONDO:
+            ruta = generar_fondo(directorio, duracion_fondo, args.ancho, args.alto)
+            duracion = duracion_fondo + args.extra
+
+            fondo = VideoFileClip(ruta, audio=False)
+            num_loops = int(duracion / fondo.duration) + 1
+            repetido = concatenate_videoclips([fondo] * num_loops, method="compose")
+            fps_concatenado = recorrer(repetido.subclip(0, duracion), duracion)
+            repetido.close()
+            fondo.close()
+
+            bucle = LoopingBackgroundClip(ruta, duration=duracion, max_cache_bytes=int(args.memoria_mb * 2 ** 20))
+            modo = "memoria" if bucle.in_memory else "streaming"
+            fps_bucle = recorrer(bucle, duracion)
+            bucle.close()
+
+            print(f"fondo {duracion_fondo:4d} s, salida {duracion:5.0f} s: concatenate {fps_concatenado:7.1f} fps | "
+                  f"bucle ({modo}, {bucle.reopens} reaperturas) {fps_bucle:7.1f} fps")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
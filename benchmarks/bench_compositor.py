@@ -0,0 +1,79 @@
+"""
+Benchmark de composición de subtítulos: CompositeVideoClip (una capa ImageClip por
+segmento) frente a SubtitleCompositor, en fotogramas por segundo.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_compositor --ancho 1280 --alto 720 --fotogramas 120
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from moviepy.editor import CompositeVideoClip, ImageClip, VideoClip
+from PIL import Image, ImageDraw
+
+from compositor import SubtitleCompositor
+
+DURACION_SEGMENTO = 3.0
+
+
+def overlay_sintetico(i, ancho, alto):
+    """Overlay RGBA parecido al de create_text_image: franja inferior con texto."""
+    alto_overlay = int(alto * 0.15)
+    img = Image.new('RGBA', (ancho, alto_overlay), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((ancho // 6, 0, ancho * 5 // 6, alto_overlay - 10), fill=(0, 0, 0, 150))
+    draw.text((ancho // 5, alto_overlay // 3), f"Subtítulo de prueba número {i}", fill="white")
+    return np.array(img)
+
+
+def fondo_sintetico(ancho, alto, duracion):
+    """
+    Fondo de color liso que entrega un objeto distinto (una vista de solo lectura) en cada
+    fotograma, como el lector de video. Un ColorClip devuelve siempre el mismo array y
+    SubtitleCompositor reutilizaría el fotograma ya compuesto en vez de medir la mezcla.
+    """
+    base = np.empty((alto, ancho, 3), dtype=np.uint8)
+    base[:] = (30, 90, 160)
+    base.flags.writeable = False
+    return VideoClip(lambda t: base.view(), duration=duracion)
+
+
+def medir(clip, tiempos):
+    inicio = time.perf_counter()
+    for t in tiempos:
+        clip.get_frame(t)
+    return len(tiempos) / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ancho", type=int, default=1280)
+    parser.add_argument("--alto", type=int, default=720)
+    parser.add_argument("--fotogramas", type=int, default=120)
+    args = parser.parse_args()
+
+    for num_segmentos in (10, 100, 500):
+        duracion = num_segmentos * DURACION_SEGMENTO
+        fondo = fondo_sintetico(args.ancho, args.alto, duracion)
+        linea_tiempo = [(i * DURACION_SEGMENTO, (i + 1) * DURACION_SEGMENTO, overlay_sintetico(i, args.ancho, args.alto))
+                        for i in range(num_segmentos)]
+        tiempos = np.linspace(0, duracion, args.fotogramas, endpoint=False)
+
+        capas = [ImageClip(overlay, transparent=True).set_start(inicio).set_duration(fin - inicio).set_pos(("center", "bottom"))
+                 for inicio, fin, overlay in linea_tiempo]
+        compuesto = CompositeVideoClip([fondo] + capas)
+        directo = SubtitleCompositor(linea_tiempo, (args.ancho, args.alto)).apply(fondo)
+
+        fps_compuesto = medir(compuesto, tiempos)
+        fps_directo = medir(directo, tiempos)
+        print(f"{num_segmentos:4d} segmentos: CompositeVideoClip {fps_compuesto:7.1f} fps | "
+              f"SubtitleCompositor {fps_directo:7.1f} fps | x{fps_directo / fps_compuesto:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark de los perfiles de render (draft, standard, archive) sobre fondos sintéticos de
+varias resoluciones, comparados con los ajustes fijos anteriores (resolución del fondo,
+24 fps, preset ultrafast, 4 hilos). Reporta tiempo de reloj, CPU, fotogramas de salida por
+segundo, tamaño de salida y tamaño del archivo.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_profiles --resoluciones 1280x720 1920x1080 3840x2160 --segmentos 6
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from moviepy.config import get_setting
+
+from audio import FRECUENCIA_MUESTREO, AudioTrack
+from benchmarks.bench_render_backends import medir
+from profiles import PERFILES_RENDER, RenderProfile, encoder_threads, target_size
+from render import render_ffmpeg, render_moviepy
+from text_render import render_overlays
+
+# Lo que hacía create_simple_video antes de los perfiles
+AJUSTES_ANTERIORES = RenderProfile(max_height=None, fps=24, preset="ultrafast", crf=None)
+HILOS_ANTERIORES = 4
+
+
+def generar_fondo(directorio, ancho, alto, fps, duracion):
+    ruta = os.path.join(directorio, f"fondo_{ancho}x{alto}.mp4")
+    subprocess.run([get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", f"testsrc2=size={ancho}x{alto}:rate={fps}:duration={duracion}",
+                    "-pix_fmt", "yuv420p", "-preset", "ultrafast", ruta], check=True)
+    return ruta
+
+
+def generar_audio(num_segmentos, duracion_segmento):
+    # Tono de 440 Hz en PCM int16, como el LINEAR16 que devuelve la API
+    t = np.arange(int(duracion_segmento * FRECUENCIA_MUESTREO)) / FRECUENCIA_MUESTREO
+    tono = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16).reshape(-1, 1)
+    return AudioTrack.from_segments([tono] * num_segmentos)
+
+
+def renderizar(backend, fondo, tamano_fondo, pista_audio, duraciones, perfil, hilos, salida):
+    # Igual que create_simple_video: los subtítulos se dimensionan para el tamaño de salida
+    ancho, alto = target_size(tamano_fondo, perfil.max_height)
+    textos = [f"Segmento {i}: una frase de prueba para el benchmark de perfiles de render." for i in range(len(duraciones))]
+    segmentos = list(zip(duraciones, render_overlays(textos, ancho, alto)))
+    ajustes = dict(codec='libx264', audio_codec='aac', preset=perfil.preset, threads=hilos, crf=perfil.crf)
+    if backend == "ffmpeg":
+        render_ffmpeg(fondo, pista_audio, segmentos, salida, (ancho, alto), fps=perfil.fps, **ajustes)
+    else:
+        render_moviepy(fondo, pista_audio, segmentos, salida, fps=perfil.fps, max_height=perfil.max_height,
+                       logger=None, **ajustes)
+    return ancho, alto
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resoluciones", nargs="+", default=["1280x720", "1920x1080", "3840x2160"])
+    parser.add_argument("--fps-fondo", type=float, default=24)
+    parser.add_argument("--segmentos", type=int, default=6)
+    parser.add_argument("--duracion-segmento", type=float, default=2)
+    parser.add_argument("--backend", choices=("moviepy", "ffmpeg"), default="moviepy")
+    parser.add_argument("--perfiles", nargs="+", default=list(PERFILES_RENDER), choices=list(PERFILES_RENDER))
+    args = parser.parse_args()
+
+    hilos = encoder_threads()
+    pista_audio, duraciones = generar_audio(args.segmentos, args.duracion_segmento)
+    print(f"Backend {args.backend}, {pista_audio.duration:.0f} s de video, fondo a {args.fps_fondo:g} fps, "
+          f"{hilos} hilos de codificación para los perfiles")
+
+    directorio = tempfile.mkdtemp(prefix="bench_perfiles_")
+    try:
+        for resolucion in args.resoluciones:
+            ancho, alto = (int(valor) for valor in resolucion.split("x"))
+            fondo = generar_fondo(directorio, ancho, alto, args.fps_fondo, 5)
+            print(f"\nFondo {ancho}x{alto}")
+
+            casos = [("anterior", AJUSTES_ANTERIORES, HILOS_ANTERIORES)]
+            casos += [(nombre, PERFILES_RENDER[nombre], hilos) for nombre in args.perfiles]
+            for nombre, perfil, hilos_caso in casos:
+                salida = os.path.join(directorio, f"salida_{nombre}.mp4")
+                tamano = []
+                reloj, cpu = medir(lambda: tamano.extend(
+                    renderizar(args.backend, fondo, (ancho, alto), pista_audio, duraciones, perfil, hilos_caso, salida)))
+                fotogramas = round(pista_audio.duration * perfil.fps)
+                print(f"{nombre:>9}: {tamano[0]:>4}x{tamano[1]:<4} {perfil.fps:>2} fps | reloj {reloj:7.2f} s | "
+                      f"CPU {cpu:7.2f} s | {fotogramas / reloj:7.1f} fotogramas/s | "
+                      f"{os.path.getsize(salida) / 2 ** 20:6.2f} MB")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
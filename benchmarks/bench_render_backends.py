@@ -0,0 +1,91 @@
+"""
+Benchmark de los backends de render (moviepy frente a ffmpeg) con las mismas entradas
+sintéticas: fondo generado con testsrc, audio senoidal por segmento y subtítulos reales.
+Reporta tiempo de reloj y tiempo de CPU (proceso + subprocesos de ffmpeg).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_render_backends --segmentos 20 --ancho 1280 --alto 720
+"""
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from moviepy.config import get_setting
+
+from audio import FRECUENCIA_MUESTREO, AudioTrack
+from render import render_ffmpeg, render_moviepy
+from text_render import render_overlays
+
+AJUSTES_CODIFICACION = dict(codec='libx264', audio_codec='aac', preset='ultrafast', threads=4)
+
+
+def generar_entradas(directorio, num_segmentos, ancho, alto, duracion_fondo, duracion_segmento):
+    ffmpeg = get_setting("FFMPEG_BINARY")
+    fondo = os.path.join(directorio, "fondo.mp4")
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", f"testsrc=size={ancho}x{alto}:rate=30:duration={duracion_fondo}",
+                    "-pix_fmt", "yuv420p", fondo], check=True)
+
+    # Tono de 440 Hz en PCM int16, como el LINEAR16 que devuelve la API
+    t = np.arange(int(duracion_segmento * FRECUENCIA_MUESTREO)) / FRECUENCIA_MUESTREO
+    tono = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16).reshape(-1, 1)
+    pista_audio, duraciones = AudioTrack.from_segments([tono] * num_segmentos)
+
+    textos = [f"Segmento {i}: una frase de prueba para el benchmark de los backends de render." for i in range(num_segmentos)]
+    overlays = render_overlays(textos, ancho, alto)
+    return fondo, pista_audio, list(zip(duraciones, overlays))
+
+
+def medir(funcion):
+    antes_propio = resource.getrusage(resource.RUSAGE_SELF)
+    antes_hijos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    inicio = time.perf_counter()
+    funcion()
+    reloj = time.perf_counter() - inicio
+    despues_propio = resource.getrusage(resource.RUSAGE_SELF)
+    despues_hijos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = sum(despues.ru_utime + despues.ru_stime - antes.ru_utime - antes.ru_stime
+              for antes, despues in ((antes_propio, despues_propio), (antes_hijos, despues_hijos)))
+    return reloj, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segmentos", type=int, default=20)
+    parser.add_argument("--ancho", type=int, default=1280)
+    parser.add_argument("--alto", type=int, default=720)
+    parser.add_argument("--duracion-fondo", type=float, default=5)
+    parser.add_argument("--duracion-segmento", type=float, default=2)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="bench_backends_")
+    try:
+        fondo, pista_audio, segmentos = generar_entradas(directorio, args.segmentos, args.ancho, args.alto,
+                                            args.duracion_fondo, args.duracion_segmento)
+        salida = os.path.join(directorio, "salida.mp4")
+        duracion = args.segmentos * args.duracion_segmento
+        print(f"{args.segmentos} segmentos, {duracion:.0f} s de video a {args.ancho}x{args.alto}")
+
+        backends = {
+            "moviepy": lambda: render_moviepy(fondo, pista_audio, segmentos, salida, fps=24, logger=None,
+                                              **AJUSTES_CODIFICACION),
+            "ffmpeg": lambda: render_ffmpeg(fondo, pista_audio, segmentos, salida, (args.ancho, args.alto), fps=24,
+                                            **AJUSTES_CODIFICACION),
+        }
+        for nombre, funcion in backends.items():
+            reloj, cpu = medir(funcion)
+            print(f"{nombre:>8}: reloj {reloj:7.2f} s | CPU {cpu:7.2f} s | {duracion * 24 / reloj:7.1f} fps")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Microbenchmark de generación de overlays de subtítulos a 1080p y 4K: implementación
+original de create_text_image (fuente recargada y overlay a ancho completo por llamada)
+frente al lote de text_render con fuentes y líneas en caché.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_text_render --segmentos 200
+"""
+import argparse
+import os
+import sys
+import textwrap
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import text_render
+from text_render import render_overlays
+
+RESOLUCIONES = {"1080p": (1920, 1080), "4K": (3840, 2160)}
+
+
+def create_text_image_original(text, video_width, video_height, bg_color=(0, 0, 0, 150), text_color="white"):
+    """Copia de la implementación anterior, usada como línea base."""
+    font_size = int(video_height * 0.05)
+    line_height = int(font_size * 1.2)
+    padding = int(video_height * 0.01)
+    bottom_margin = int(video_height * 0.02)
+
+    lines = textwrap.fill(text, width=60).split('\n')
+    image_height = len(lines) * line_height + 2 * padding + bottom_margin
+
+    img = Image.new('RGBA', (video_width, image_height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.truetype(text_render.RUTA_FUENTE, font_size)
+
+    max_line_width = 0
+    for line in lines:
+        left, top, right, bottom = draw.textbbox((0, 0), line, font=font)
+        max_line_width = max(max_line_width, right - left)
+
+    rect_x0 = (video_width - max_line_width) // 2 - padding
+    rect_x1 = rect_x0 + max_line_width + 2 * padding
+    draw.rectangle((rect_x0, padding, rect_x1, image_height - bottom_margin - padding), fill=bg_color)
+
+    y = padding
+    for line in lines:
+        left, top, right, bottom = draw.textbbox((0, 0), line, font=font)
+        draw.text(((img.width - (right - left)) // 2, y), line, font=font, fill=text_color)
+        y += line_height
+
+    return np.array(img)
+
+
+def guion_sintetico(num_segmentos):
+    # Frases repetidas, como en un guion regenerado con pequeñas ediciones
+    frases = [f"Esta es la frase número {i % 25} del guion, con algo más de texto para ocupar varias líneas."
+              for i in range(num_segmentos * 3)]
+    return [" ".join(frases[i * 3:(i + 1) * 3]) for i in range(num_segmentos)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segmentos", type=int, default=200)
+    args = parser.parse_args()
+    segmentos = guion_sintetico(args.segmentos)
+
+    for nombre, (ancho, alto) in RESOLUCIONES.items():
+        inicio = time.perf_counter()
+        originales = [create_text_image_original(s, ancho, alto) for s in segmentos]
+        t_original = time.perf_counter() - inicio
+
+        for cache in (text_render.load_font, text_render.measure_line, text_render.rasterize_line):
+            cache.cache_clear()
+        inicio = time.perf_counter()
+        compactos = render_overlays(segmentos, ancho, alto)
+        t_lote = time.perf_counter() - inicio
+
+        mb_original = sum(o.nbytes for o in originales) / 2 ** 20
+        mb_compacto = sum(o.nbytes for o in compactos) / 2 ** 20
+        print(f"{nombre:>5}: original {args.segmentos / t_original:7.1f} overlays/s ({mb_original:7.1f} MB) | "
+              f"lote {args.segmentos / t_lote:7.1f} overlays/s ({mb_compacto:7.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark de la etapa de síntesis contra un cliente TTS falso con latencia artificial.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_tts --segmentos 40 --latencia 0.3
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import texttospeech
+
+from tts import TokenBucket, synthesize_segments
+
+
+class FakeTTSClient:
+    """Cliente que imita synthesize_speech durmiendo `latencia` segundos por solicitud."""
+
+    def __init__(self, latencia=0.3):
+        self.latencia = latencia
+
+    def synthesize_speech(self, input, voice, audio_config):
+        time.sleep(self.latencia)
+        return texttospeech.SynthesizeSpeechResponse(audio_content=input.text.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segmentos", type=int, default=40)
+    parser.add_argument("--latencia", type=float, default=0.3)
+    parser.add_argument("--tasa", type=float, default=5, help="Solicitudes por segundo del token bucket")
+    args = parser.parse_args()
+
+    client = FakeTTSClient(args.latencia)
+    segmentos = [f"Segmento de prueba número {i}." for i in range(args.segmentos)]
+    voice = texttospeech.VoiceSelectionParams(language_code="es-ES", name="es-ES-Standard-B")
+    audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
+
+    # Línea base: el bucle secuencial original (una solicitud + sleep de 0.2 s por segmento)
+    inicio = time.perf_counter()
+    for segmento in segmentos:
+        client.synthesize_speech(input=texttospeech.SynthesisInput(text=segmento), voice=voice, audio_config=audio_config)
+        time.sleep(0.2)
+    print(f"secuencial       : {time.perf_counter() - inicio:7.2f} s")
+
+    for workers in (1, 2, 4, 8):
+        inicio = time.perf_counter()
+        respuestas = synthesize_segments(client, segmentos, voice, audio_config,
+                                         max_workers=workers, rate_limiter=TokenBucket(args.tasa))
+        transcurrido = time.perf_counter() - inicio
+        assert [r.audio_content.decode("utf-8") for r in respuestas] == segmentos
+        print(f"pool workers={workers:<3}: {transcurrido:7.2f} s")
+
+
+if __name__ == "__main__":
+    main()
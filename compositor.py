@@ -0,0 +1,110 @@
+import bisect
+import time
+
+import numpy as np
+
+
+class SubtitleCompositor:
+    """
+    Superpone subtítulos directamente sobre cada fotograma del fondo.
+
+    Recibe una línea de tiempo de entradas (inicio, fin, overlay RGBA) que no se solapan.
+    En cada fotograma busca la entrada activa con un índice ordenado de intervalos
+    (búsqueda binaria) y mezcla solo la franja inferior donde está el overlay, en lugar
+    de recorrer una capa de CompositeVideoClip por segmento.
+    """
+
+    def __init__(self, timeline, frame_size):
+        self.frame_width, self.frame_height = frame_size
+        entradas = sorted(timeline, key=lambda entrada: entrada[0])
+        self._inicios = [inicio for inicio, _, _ in entradas]
+        self._finales = [fin for _, fin, _ in entradas]
+        self._capas = [self._preparar_capa(overlay) for _, _, overlay in entradas]
+
+    def _preparar_capa(self, overlay):
+        """
+        Recorta el overlay a su zona visible y precalcula el búfer con alfa premultiplicado.
+        El overlay se coloca centrado horizontalmente y pegado al borde inferior,
+        igual que set_pos(("center", "bottom")).
+        """
+        overlay = np.asarray(overlay)
+        alto, ancho = overlay.shape[:2]
+        x0 = (self.frame_width - ancho) // 2
+        y0 = self.frame_height - alto
+
+        # Descarta las filas/columnas totalmente transparentes
+        alfa = overlay[:, :, 3]
+        filas = np.flatnonzero(alfa.any(axis=1))
+        columnas = np.flatnonzero(alfa.any(axis=0))
+        if len(filas) == 0:
+            return None
+        fila0, fila1 = filas[0], filas[-1] + 1
+        col0, col1 = columnas[0], columnas[-1] + 1
+
+        # Recorta además lo que quede fuera del fotograma
+        fila0 = max(fila0, -y0)
+        col0 = max(col0, -x0)
+        fila1 = min(fila1, self.frame_height - y0)
+        col1 = min(col1, self.frame_width - x0)
+        if fila0 >= fila1 or col0 >= col1:
+            return None
+
+        recorte = overlay[fila0:fila1, col0:col1].astype(np.uint16)
+        alfa = recorte[:, :, 3:4]
+        # fondo * (255 - a) + color * a + 127 <= 255 * 255 + 127, por lo que cabe en uint16;
+        # el 127 hace que la división entera posterior redondee al entero más cercano
+        premultiplicado = recorte[:, :, :3] * alfa + 127
+        alfa_inverso = 255 - alfa
+        return (y0 + fila0, y0 + fila1, x0 + col0, x0 + col1, premultiplicado, alfa_inverso)
+
+    def active_index(self, t):
+        """Índice de la entrada activa en el instante `t`, o None."""
+        i = bisect.bisect_right(self._inicios, t) - 1
+        if i >= 0 and t < self._finales[i]:
+            return i
+        return None
+
+    def blend(self, frame, t):
+        i = self.active_index(t)
+        if i is None or self._capas[i] is None:
+            return frame
+        y0, y1, x0, x1, premultiplicado, alfa_inverso = self._capas[i]
+
+        # Se mezcla sobre una copia: el fotograma de origen puede ser de solo lectura (lector de
+        # ffmpeg, búfer del fondo) o el mismo objeto en cada llamada (ImageClip, ColorClip)
+        frame = frame.copy()
+        franja = frame[y0:y1, x0:x1, :3].astype(np.uint16)
+        franja *= alfa_inverso
+        franja += premultiplicado
+        franja //= 255
+        frame[y0:y1, x0:x1, :3] = franja
+        return frame
+
+    def apply(self, background_clip, trace=None):
+        """
+        Devuelve un clip con los subtítulos aplicados sobre `background_clip`.
+        Si el fondo entrega el mismo fotograma (el mismo objeto) con el mismo subtítulo activo,
+        como ocurre cuando el fondo tiene menos fps que la salida, se reutiliza el fotograma
+        ya compuesto. Con `trace` se acumula por separado el tiempo de obtener el fotograma
+        del fondo y el de mezclarlo.
+        """
+        anterior = [None, None, None]  # Fotograma del fondo, subtítulo activo y resultado
+
+        def componer(get_frame, t):
+            inicio = time.perf_counter()
+            frame = get_frame(t)
+            medio = time.perf_counter()
+            activo = self.active_index(t)
+            if frame is anterior[0] and activo == anterior[1]:
+                if trace is not None:
+                    trace.count("fotogramas_reutilizados")
+                return anterior[2]
+            # Se guarda también el fotograma del fondo para que su identidad siga siendo válida
+            anterior[:] = frame, activo, self.blend(frame, t)
+            if trace is not None:
+                trace.add_time("decodificacion_fondo", medio - inicio)
+                trace.add_time("composicion_subtitulos", time.perf_counter() - medio)
+                trace.count("fotogramas_compuestos")
+            return anterior[2]
+
+        return background_clip.fl(componer)
@@ -0,0 +1,329 @@
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from profiles import encoder_threads
+from profiling import RenderTrace
+from video import create_simple_video
+
+# Configuración predeterminada de la cola de trabajos
+DIRECTORIO_TRABAJOS = os.environ.get("JOBS_DIR", os.path.join(tempfile.gettempdir(), "video_jobs"))
+MAX_RENDERS_SIMULTANEOS = int(os.environ.get("MAX_RENDERS", max(1, (os.cpu_count() or 2) // 2)))
+INTERVALO_PROGRESO = 0.5  # Segundos mínimos entre escrituras de progreso en la base de datos
+RETENCION_RESULTADOS = int(os.environ.get("RESULTS_TTL", 24 * 3600))  # Segundos que se conservan en disco
+INTERVALO_LIMPIEZA = 60  # Segundos entre limpiezas (trabajos caducados y on_cleanup)
+TAMANO_BLOQUE_COPIA = 1024 * 1024  # Bytes por bloque al copiar los archivos subidos
+PERFILAR_FOTOGRAMAS = os.environ.get("PROFILE_FRAMES", "0") == "1"  # cProfile del bucle de fotogramas
+ARCHIVO_FONDO = "background.mp4"  # Fondo subido, dentro del directorio del trabajo
+
+PENDIENTE = "pendiente"
+EN_CURSO = "en_curso"
+COMPLETADO = "completado"
+ERROR = "error"
+CANCELADO = "cancelado"
+ESTADOS_FINALES = (COMPLETADO, ERROR, CANCELADO)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobStore:
+    """
+    Cola de trabajos persistente en SQLite, compartida entre la app y los procesos de render.
+    """
+
+    def __init__(self, directory=DIRECTORIO_TRABAJOS):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = os.path.join(directory, "jobs.db")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    estado TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    creado REAL NOT NULL,
+                    actualizado REAL NOT NULL,
+                    segmentos_sintetizados INTEGER NOT NULL DEFAULT 0,
+                    segmentos_totales INTEGER,
+                    fotogramas_codificados INTEGER NOT NULL DEFAULT 0,
+                    fotogramas_totales INTEGER,
+                    cancelar INTEGER NOT NULL DEFAULT 0,
+                    resultado TEXT,
+                    mensaje TEXT,
+                    perfil TEXT
+                )
+            """)
+            # Bases de datos creadas antes de que existiera la columna del perfil
+            columnas = {fila["name"] for fila in conn.execute("PRAGMA table_info(jobs)")}
+            if "perfil" not in columnas:
+                conn.execute("ALTER TABLE jobs ADD COLUMN perfil TEXT")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def job_dir(self, job_id):
+        return os.path.join(self.directory, job_id)
+
+    def create(self, params):
+        job_id = uuid.uuid4().hex
+        ahora = time.time()
+        os.makedirs(self.job_dir(job_id), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("INSERT INTO jobs (id, estado, params, creado, actualizado) VALUES (?, ?, ?, ?, ?)",
+                         (job_id, PENDIENTE, json.dumps(params), ahora, ahora))
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            fila = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if fila is None:
+            return None
+        job = dict(fila)
+        job["params"] = json.loads(job["params"])
+        job["perfil"] = json.loads(job["perfil"]) if job["perfil"] else None
+        return job
+
+    def list(self, estados=None):
+        with self._connect() as conn:
+            if estados:
+                marcas = ", ".join("?" for _ in estados)
+                filas = conn.execute(f"SELECT id FROM jobs WHERE estado IN ({marcas}) ORDER BY creado",
+                                     tuple(estados)).fetchall()
+            else:
+                filas = conn.execute("SELECT id FROM jobs ORDER BY creado").fetchall()
+        return [fila["id"] for fila in filas]
+
+    def update(self, job_id, **campos):
+        campos["actualizado"] = time.time()
+        asignaciones = ", ".join(f"{campo} = ?" for campo in campos)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {asignaciones} WHERE id = ?", tuple(campos.values()) + (job_id,))
+
+    def finish(self, job_id, estado, **campos):
+        """Pasa el trabajo a un estado final y borra su fondo subido, que ya no hace falta."""
+        self.update(job_id, estado=estado, **campos)
+        self.remove_upload(job_id)
+
+    def remove_upload(self, job_id):
+        try:
+            os.remove(os.path.join(self.job_dir(job_id), ARCHIVO_FONDO))
+        except OSError:
+            pass
+
+    def request_cancel(self, job_id):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET cancelar = 1, actualizado = ? WHERE id = ?", (time.time(), job_id))
+
+    def is_cancel_requested(self, job_id):
+        with self._connect() as conn:
+            fila = conn.execute("SELECT cancelar FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(fila and fila["cancelar"])
+
+    def purge_expired(self, ttl=RETENCION_RESULTADOS):
+        """
+        Borra los trabajos terminados hace más de `ttl` segundos junto con su directorio
+        (video resultante incluido). Devuelve las rutas de los resultados borrados.
+        """
+        limite = time.time() - ttl
+        marcas = ", ".join("?" for _ in ESTADOS_FINALES)
+        with self._connect() as conn:
+            filas = conn.execute(f"SELECT id, resultado FROM jobs WHERE estado IN ({marcas}) AND actualizado < ?",
+                                 ESTADOS_FINALES + (limite,)).fetchall()
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(fila["id"],) for fila in filas])
+        for fila in filas:
+            shutil.rmtree(self.job_dir(fila["id"]), ignore_errors=True)
+        if filas:
+            logging.info(f"Borrados {len(filas)} trabajos caducados")
+        return [fila["resultado"] for fila in filas if fila["resultado"]]
+
+
+class ProgressReporter:
+    """
+    Callback de progreso para create_simple_video que se ejecuta en el proceso de render.
+    Guarda el avance en la base de datos como mucho cada `interval` segundos y, en cada
+    escritura, comprueba si se pidió cancelar el trabajo.
+    """
+
+    def __init__(self, store, job_id, interval=INTERVALO_PROGRESO):
+        self.store = store
+        self.job_id = job_id
+        self.interval = interval
+        self._ultima_escritura = 0
+        self._campos = {}
+
+    def __call__(self, etapa, actual, total):
+        if etapa == "sintesis":
+            self._campos.update(segmentos_sintetizados=actual, segmentos_totales=total)
+        elif etapa == "codificacion":
+            self._campos.update(fotogramas_codificados=actual, fotogramas_totales=total)
+
+        ahora = time.monotonic()
+        if ahora - self._ultima_escritura >= self.interval or actual == total:
+            self._ultima_escritura = ahora
+            self.store.update(self.job_id, **self._campos)
+            if self.store.is_cancel_requested(self.job_id):
+                raise JobCancelled("Trabajo cancelado")
+
+
+def run_job(directory, job_id):
+    """
+    Punto de entrada de los procesos de render: ejecuta un trabajo y guarda su resultado.
+    """
+    logging.basicConfig(level=logging.INFO)
+    store = None
+    try:
+        store = JobStore(directory)
+        _ejecutar_trabajo(store, job_id)
+    except Exception as e:
+        # Cualquier fallo fuera del render (base de datos bloqueada, traza sin escribir...)
+        # también termina el trabajo; si no, se quedaría en curso y la app esperaría para siempre
+        logging.exception(f"Error en el trabajo {job_id}")
+        if store is None:
+            raise  # Sin base de datos no se puede marcar aquí; lo hace JobManager con el futuro
+        try:
+            store.finish(job_id, ERROR, mensaje=f"Error en el trabajo: {e}")
+        except Exception:
+            logging.exception(f"No se pudo marcar el trabajo {job_id} como fallido")
+            raise
+
+
+def _ejecutar_trabajo(store, job_id):
+    job = store.get(job_id)
+    if job is None or job["estado"] != PENDIENTE:
+        return
+    if job["cancelar"]:
+        store.finish(job_id, CANCELADO, mensaje="Trabajo cancelado")
+        return
+
+    store.update(job_id, estado=EN_CURSO)
+    params = dict(job["params"])
+    trace = RenderTrace(name=f"render {job_id}", profile_frames=params.pop("profile_frames", PERFILAR_FOTOGRAMAS))
+    try:
+        success, message, video_path = create_simple_video(
+            progress=ProgressReporter(store, job_id),
+            output_dir=store.job_dir(job_id),
+            trace=trace,
+            **params
+        )
+    finally:
+        # El fondo subido solo hace falta durante el render
+        store.remove_upload(job_id)
+        # La traza se guarda también si el render falló o se canceló
+        trace.write(store.job_dir(job_id))
+        store.update(job_id, perfil=json.dumps(trace.summary()))
+
+    if store.is_cancel_requested(job_id):
+        if video_path and os.path.exists(video_path):
+            os.remove(video_path)
+        store.finish(job_id, CANCELADO, mensaje="Trabajo cancelado")
+    elif success:
+        store.finish(job_id, COMPLETADO, resultado=video_path, mensaje=message)
+    else:
+        store.finish(job_id, ERROR, mensaje=message)
+
+
+class JobManager:
+    """
+    Cola local de renders con un pool de procesos y un límite de renders simultáneos.
+    El estado de cada trabajo vive en SQLite, así que sobrevive a los reruns de Streamlit.
+    """
+
+    def __init__(self, directory=DIRECTORIO_TRABAJOS, max_workers=MAX_RENDERS_SIMULTANEOS,
+                 result_ttl=RETENCION_RESULTADOS, on_purge=None, on_cleanup=None):
+        self.store = JobStore(directory)
+        # spawn: no se hereda el estado (hilos incluidos) del proceso de Streamlit
+        self.executor = ProcessPoolExecutor(max_workers=max_workers,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self.on_purge = on_purge  # Recibe la ruta de cada resultado borrado de disco
+        self.on_cleanup = on_cleanup  # Se llama en cada limpieza periódica, sin argumentos
+        self._futuros = {}
+        self._recover()
+        self._parar = threading.Event()
+        self._limpieza = threading.Thread(target=self._cleanup_loop, daemon=True)
+        self._limpieza.start()
+
+    def _recover(self):
+        # Los trabajos en curso de una ejecución anterior murieron con ella; los pendientes se reencolan
+        for job_id in self.store.list([EN_CURSO]):
+            self.store.finish(job_id, ERROR, mensaje="El render se interrumpió al reiniciar la aplicación")
+        for job_id in self.store.list([PENDIENTE]):
+            self._submit(job_id)
+
+    def _submit(self, job_id):
+        futuro = self.executor.submit(run_job, self.store.directory, job_id)
+        futuro.add_done_callback(lambda futuro: self._on_done(job_id, futuro))
+        self._futuros[job_id] = futuro
+
+    def _on_done(self, job_id, futuro):
+        # run_job solo propaga la excepción si no pudo marcar el trabajo (o si murió el
+        # proceso de render); se marca desde aquí para que no quede pendiente o en curso
+        if futuro.cancelled() or futuro.exception() is None:
+            return
+        try:
+            job = self.store.get(job_id)
+            if job is not None and job["estado"] not in ESTADOS_FINALES:
+                self.store.finish(job_id, ERROR, mensaje=f"Error en el trabajo: {futuro.exception()}")
+        except Exception as e:
+            logging.error(f"No se pudo marcar el trabajo {job_id} como fallido: {e}")
+
+    def _cleanup_loop(self):
+        while True:
+            try:
+                for ruta in self.store.purge_expired(self.result_ttl):
+                    if self.on_purge is not None:
+                        self.on_purge(ruta)
+                if self.on_cleanup is not None:
+                    self.on_cleanup()
+            except Exception as e:
+                logging.error(f"Error al limpiar trabajos caducados: {e}")
+            if self._parar.wait(INTERVALO_LIMPIEZA):
+                return
+
+    def submit(self, texto, nombre_salida, voz, background_video, **opciones):
+        """
+        Encola un render y devuelve su id. `background_video` es un archivo subido (file-like)
+        que se copia por bloques al directorio del trabajo antes de encolarlo.
+        Salvo que se indique `threads`, cada render usa su parte de los núcleos según `max_workers`.
+        """
+        opciones.setdefault("threads", encoder_threads(self.max_workers))
+        params = dict(texto=texto, nombre_salida=nombre_salida, voz=voz, **opciones)
+        job_id = self.store.create(params)
+        background_video_path = os.path.join(self.store.job_dir(job_id), ARCHIVO_FONDO)
+        background_video.seek(0)
+        with open(background_video_path, "wb") as f:
+            shutil.copyfileobj(background_video, f, TAMANO_BLOQUE_COPIA)
+        params["background_video_path"] = background_video_path
+        self.store.update(job_id, params=json.dumps(params))
+
+        self._submit(job_id)
+        logging.info(f"Trabajo {job_id} encolado")
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def cancel(self, job_id):
+        self.store.request_cancel(job_id)
+        futuro = self._futuros.get(job_id)
+        if futuro is not None and futuro.cancel():
+            # Aún no había empezado: no llegará a ejecutarse
+            self.store.finish(job_id, CANCELADO, mensaje="Trabajo cancelado")
+
+    def shutdown(self):
+        self._parar.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,50 @@
+import os
+from collections import namedtuple
+
+# Ajustes de salida de un perfil de render. `max_height` es el lado corto máximo (480p, 1080p);
+# None conserva la resolución del fondo. `crf` es la calidad constante de x264 (más bajo, más
+# calidad y más tamaño).
+RenderProfile = namedtuple("RenderProfile", ["max_height", "fps", "preset", "crf"])
+
+PERFILES_RENDER = {
+    "draft": RenderProfile(max_height=480, fps=15, preset="ultrafast", crf=30),
+    "standard": RenderProfile(max_height=1080, fps=24, preset="ultrafast", crf=23),
+    "archive": RenderProfile(max_height=None, fps=30, preset="slow", crf=18),
+}
+PERFIL_PREDETERMINADO = "standard"
+MAX_HILOS_CODIFICADOR = 16  # Por encima de esto x264 apenas gana velocidad
+
+
+def get_profile(nombre):
+    try:
+        return PERFILES_RENDER[nombre]
+    except KeyError:
+        raise ValueError(f"Perfil de render desconocido: {nombre}")
+
+
+def available_cores():
+    """Núcleos que puede usar este proceso (respeta la afinidad de CPU de contenedores y taskset)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def encoder_threads(concurrent_renders=1):
+    """Hilos del codificador repartiendo los núcleos disponibles entre los renders simultáneos."""
+    return max(1, min(MAX_HILOS_CODIFICADOR, available_cores() // max(1, concurrent_renders)))
+
+
+def target_size(source_size, max_height):
+    """
+    Tamaño de salida para un fondo de `source_size`: el lado corto se reduce a `max_height`
+    (como en "1080p", así un fondo vertical no se encoge por su altura) y el otro lado se
+    escala en proporción, con ancho y alto pares como exige yuv420p. Nunca se amplía.
+    """
+    ancho, alto = source_size
+    if max_height is None or min(ancho, alto) <= max_height:
+        return ancho, alto
+    lado_corto = max_height - max_height % 2
+    if alto <= ancho:
+        return max(2, round(ancho * lado_corto / alto / 2) * 2), lado_corto
+    return lado_corto, max(2, round(alto * lado_corto / ancho / 2) * 2)
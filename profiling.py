@@ -0,0 +1,230 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import resource
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+INTERVALO_MUESTREO_RSS = 0.2  # Segundos entre muestras de memoria residente
+LINEAS_PERFIL = 25  # Funciones que se guardan del perfil de cProfile
+
+_TAMANO_PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss(pid="self"):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * _TAMANO_PAGINA
+
+
+def current_rss():
+    """Memoria residente actual del proceso en bytes (pico hasta ahora si no hay /proc)."""
+    try:
+        return _rss()
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss está en KB en Linux y en bytes en macOS
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo if os.uname().sysname == "Darwin" else maximo * 1024
+
+
+def children_rss():
+    """Memoria residente de los subprocesos directos (p. ej. ffmpeg), o 0 si no hay /proc."""
+    pid_propio = os.getpid()
+    total = 0
+    try:
+        pids = [nombre for nombre in os.listdir("/proc") if nombre.isdigit()]
+    except OSError:
+        return 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # El campo del padre va después del nombre entre paréntesis, que puede contener espacios
+                padre = int(f.read().rsplit(")", 1)[1].split()[1])
+            if padre == pid_propio:
+                total += _rss(pid)
+        except (OSError, ValueError, IndexError):
+            pass  # El proceso terminó entre la lista y la lectura
+    return total
+
+
+class RenderTrace:
+    """
+    Instrumentación de un render: intervalos con nombre por etapa y por segmento, contadores,
+    tiempos acumulados de operaciones por fotograma y muestras de la memoria residente.
+
+    Se puede usar desde varios hilos. Como contexto (`with trace:`) muestrea la memoria en un
+    hilo aparte. Con `profile_frames=True`, `profile_frames()` ejecuta el bucle de fotogramas
+    bajo cProfile.
+    """
+
+    def __init__(self, name="render", profile_frames=False, sample_interval=INTERVALO_MUESTREO_RSS):
+        self.name = name
+        self.sample_interval = sample_interval
+        self.spans = []  # (nombre, categoría, inicio, fin, id de hilo, args)
+        self.counters = Counter()
+        self.timers = defaultdict(float)  # nombre -> segundos acumulados
+        self.rss_samples = []  # (instante, bytes del proceso, bytes de los subprocesos)
+        self.peak_rss = 0
+        self.peak_children_rss = 0
+        self.profiler = cProfile.Profile() if profile_frames else None
+        self._lock = threading.Lock()
+        self._hilos = {}
+        self._t0 = time.perf_counter()
+        self._epoch = time.time()
+        self._fin = None
+        self._parar = threading.Event()
+        self._muestreador = None
+
+    def _ahora(self):
+        return time.perf_counter() - self._t0
+
+    # Registro
+
+    @contextmanager
+    def span(self, name, category="etapa", **args):
+        """Mide el bloque como un intervalo; `args` se guardan con él (y pueden ampliarse dentro)."""
+        inicio = self._ahora()
+        try:
+            yield args
+        finally:
+            self.add_span(name, inicio, self._ahora(), category, **args)
+
+    def add_span(self, name, start, end, category="etapa", **args):
+        hilo = threading.current_thread()
+        with self._lock:
+            self._hilos.setdefault(hilo.ident, hilo.name)
+            self.spans.append((name, category, start, end, hilo.ident, args))
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def add_time(self, name, seconds):
+        """Acumula segundos de una operación demasiado frecuente para guardarla como intervalo."""
+        with self._lock:
+            self.timers[name] += seconds
+
+    @contextmanager
+    def profile_frames(self):
+        """Ejecuta el bloque bajo cProfile si el perfilado de fotogramas está activo."""
+        if self.profiler is None:
+            yield
+            return
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+
+    # Memoria
+
+    def _muestrear(self):
+        rss = current_rss()
+        rss_hijos = children_rss()
+        with self._lock:
+            self.rss_samples.append((self._ahora(), rss, rss_hijos))
+            self.peak_rss = max(self.peak_rss, rss)
+            self.peak_children_rss = max(self.peak_children_rss, rss_hijos)
+
+    def _bucle_muestreo(self):
+        while not self._parar.wait(self.sample_interval):
+            self._muestrear()
+
+    def start(self):
+        """Empieza a muestrear la memoria en un hilo aparte."""
+        self._muestrear()
+        self._parar.clear()
+        self._muestreador = threading.Thread(target=self._bucle_muestreo, daemon=True)
+        self._muestreador.start()
+
+    def stop(self):
+        """Detiene el muestreo y fija la duración total del render."""
+        if self._muestreador is None:
+            return
+        self._parar.set()
+        self._muestreador.join()
+        self._muestreador = None
+        self._muestrear()
+        self._fin = self._ahora()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    # Resultados
+
+    def summary(self):
+        """Resumen serializable: tiempo total por etapa, contadores, tiempos acumulados y memoria."""
+        with self._lock:
+            etapas = defaultdict(float)
+            for nombre, categoria, inicio, fin, _, _ in self.spans:
+                if categoria == "etapa":
+                    etapas[nombre] += fin - inicio
+            return {
+                "nombre": self.name,
+                "duracion": round(self._fin if self._fin is not None else self._ahora(), 4),
+                "etapas": {nombre: round(segundos, 4) for nombre, segundos in etapas.items()},
+                "contadores": dict(self.counters),
+                "tiempos": {nombre: round(segundos, 4) for nombre, segundos in self.timers.items()},
+                "pico_rss_mb": round(self.peak_rss / 2 ** 20, 1),
+                "pico_rss_subprocesos_mb": round(self.peak_children_rss / 2 ** 20, 1),
+            }
+
+    def profile_stats(self, limit=LINEAS_PERFIL):
+        """Las `limit` funciones con más tiempo acumulado según cProfile, como texto."""
+        if self.profiler is None:
+            return None
+        salida = io.StringIO()
+        pstats.Stats(self.profiler, stream=salida).sort_stats("cumulative").print_stats(limit)
+        return salida.getvalue()
+
+    def to_dict(self):
+        with self._lock:
+            spans = [{"nombre": nombre, "categoria": categoria, "inicio": round(inicio, 6),
+                      "duracion": round(fin - inicio, 6), "hilo": self._hilos.get(hilo, str(hilo)), "args": args}
+                     for nombre, categoria, inicio, fin, hilo, args in self.spans]
+            rss = [[round(t, 3), b, hijos] for t, b, hijos in self.rss_samples]
+        return {"resumen": self.summary(), "inicio_epoch": self._epoch, "spans": spans, "rss": rss,
+                "perfil_fotogramas": self.profile_stats()}
+
+    def to_chrome_trace(self):
+        """Eventos en el formato Trace Event de Chrome (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        eventos = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": self.name}}]
+        with self._lock:
+            for hilo, nombre in self._hilos.items():
+                eventos.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": hilo, "args": {"name": nombre}})
+            for nombre, categoria, inicio, fin, hilo, args in self.spans:
+                eventos.append({"name": nombre, "cat": categoria, "ph": "X", "pid": pid, "tid": hilo,
+                                "ts": round(inicio * 1e6), "dur": round((fin - inicio) * 1e6), "args": args})
+            for t, rss, rss_hijos in self.rss_samples:
+                eventos.append({"name": "rss_mb", "ph": "C", "pid": pid, "tid": 0, "ts": round(t * 1e6),
+                                "args": {"proceso": round(rss / 2 ** 20, 1),
+                                         "subprocesos": round(rss_hijos / 2 ** 20, 1)}})
+        return {"traceEvents": eventos, "displayTimeUnit": "ms"}
+
+    def write(self, directory, prefix="traza"):
+        """
+        Guarda `<prefix>.json` (traza completa), `<prefix>_chrome.json` (Trace Event) y, si se
+        perfiló el bucle de fotogramas, `<prefix>_fotogramas.prof`. Devuelve las rutas escritas.
+        """
+        os.makedirs(directory, exist_ok=True)
+        rutas = {"json": os.path.join(directory, f"{prefix}.json"),
+                 "chrome": os.path.join(directory, f"{prefix}_chrome.json")}
+        with open(rutas["json"], "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+        with open(rutas["chrome"], "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+        if self.profiler is not None:
+            rutas["perfil"] = os.path.join(directory, f"{prefix}_fotogramas.prof")
+            self.profiler.dump_stats(rutas["perfil"])
+        logging.info(f"Traza del render guardada en {rutas['json']}")
+        return rutas
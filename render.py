@@ -0,0 +1,190 @@
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+import proglog
+from moviepy.config import get_setting
+from PIL import Image
+
+from audio import stereo_output_args
+from background import MEMORIA_MAXIMA_FONDO, LoopingBackgroundClip
+from compositor import SubtitleCompositor
+from profiling import RenderTrace
+
+BACKENDS = ("moviepy", "ffmpeg")
+
+
+class FrameProgressLogger(proglog.ProgressBarLogger):
+    """
+    Logger de proglog para write_videofile que informa de los fotogramas codificados
+    mediante `progress("codificacion", actual, total)`. `offset` permite acumular varios
+    fragmentos; si `total` es None se usa el total de la barra de moviepy.
+    """
+
+    def __init__(self, progress, offset=0, total=None):
+        proglog.ProgressBarLogger.__init__(self)
+        self.progress = progress
+        self.offset = offset
+        self.total = total
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        # moviepy recorre los fotogramas con la barra "t"; "chunk" es el audio
+        if bar == "t" and attr == "index":
+            total = self.total if self.total is not None else self.bars[bar]["total"]
+            self.progress("codificacion", self.offset + value + 1, total)
+
+
+def build_timeline(segmentos):
+    """Convierte [(duracion, overlay), ...] en entradas (inicio, fin, overlay) consecutivas."""
+    linea_tiempo = []
+    tiempo_acumulado = 0
+    for duracion, overlay in segmentos:
+        linea_tiempo.append((tiempo_acumulado, tiempo_acumulado + duracion, overlay))
+        tiempo_acumulado += duracion
+    return linea_tiempo
+
+
+def render_moviepy(background_video_path, pista_audio, segmentos, output_path, fps=24,
+                   background_memory_cap=MEMORIA_MAXIMA_FONDO, progress=None, trace=None, max_height=None, crf=None,
+                   **write_kwargs):
+    """
+    Renderiza el video con moviepy: fondo en bucle, subtítulos y la pista de audio completa.
+    `pista_audio` es un AudioTrack y `segmentos` una lista de (duracion, overlay RGBA) en orden.
+    Con `max_height` el fondo se reduce una sola vez al decodificarlo; los overlays deben
+    venir ya dimensionados para ese tamaño.
+    """
+    if trace is None:
+        trace = RenderTrace()
+    if progress is not None:
+        write_kwargs["logger"] = FrameProgressLogger(progress)
+    if crf is not None:
+        write_kwargs["ffmpeg_params"] = ["-crf", str(crf)]
+    with trace.span("apertura_fondo"):
+        background_clip = LoopingBackgroundClip(background_video_path, duration=pista_audio.duration,
+                                                max_cache_bytes=background_memory_cap, max_height=max_height)
+    try:
+        # Superponer los subtítulos directamente sobre los fotogramas del fondo en bucle
+        compositor = SubtitleCompositor(build_timeline(segmentos), background_clip.size)
+        final_video = compositor.apply(background_clip, trace).set_audio(pista_audio.to_clip())
+        with trace.span("codificacion", backend="moviepy", en_memoria=background_clip.in_memory), \
+                trace.profile_frames():
+            # El audio se codifica a la frecuencia de la pista, sin remuestrear en Python
+            final_video.write_videofile(output_path, fps=fps, audio_fps=pista_audio.fps, **write_kwargs)
+        trace.count("reaperturas_fondo", background_clip.reopens)
+    finally:
+        background_clip.close()
+
+
+def build_ffmpeg_command(background_video_path, pista_audio, segmentos, output_path, rutas_overlays, filtro_path,
+                         video_size, fps=24, codec='libx264', audio_codec='aac', preset='ultrafast', threads=4,
+                         crf=None):
+    """
+    Construye una única invocación de ffmpeg equivalente a render_moviepy:
+    el fondo entra con -stream_loop, se escala a `video_size` antes de los overlays (si ya
+    tiene ese tamaño, el filtro scale no hace nada), cada subtítulo es un filtro overlay
+    activo solo durante su segmento y la pista de audio completa llega como PCM por stdin.
+    Los overlays se aplican a los fps del fondo; -r duplica fotogramas ya compuestos si la
+    salida tiene más fps.
+    """
+    video_width, video_height = video_size
+    duracion_total = pista_audio.duration
+
+    comando = [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+               "-stream_loop", "-1", "-i", background_video_path]
+    for ruta in rutas_overlays:
+        comando += ["-i", ruta]
+    indice_audio = len(rutas_overlays) + 1
+    comando += ["-f", "s16le", "-ar", str(pista_audio.fps), "-ac", str(pista_audio.nchannels), "-i", "pipe:0"]
+
+    # Cadena de overlays: [0:v] -> [v1] -> ... -> [vN]
+    filtros = [f"[0:v]trim=duration={duracion_total:.6f},setpts=PTS-STARTPTS,"
+               f"scale={video_width}:{video_height}[v0]"]
+    for i, (inicio, fin, overlay) in enumerate(build_timeline(segmentos)):
+        alto, ancho = overlay.shape[:2]
+        x = (video_width - ancho) // 2
+        y = video_height - alto
+        # Intervalo semiabierto [inicio, fin), igual que en SubtitleCompositor
+        filtros.append(f"[v{i}][{i + 1}:v]overlay=x={x}:y={y}:eof_action=repeat:"
+                       f"enable='gte(t,{inicio:.6f})*lt(t,{fin:.6f})'[v{i + 1}]")
+    filtros.append(f"[v{len(segmentos)}]format=yuv420p[vout]")
+    with open(filtro_path, "w") as f:
+        f.write(";\n".join(filtros))
+
+    comando += [
+        "-filter_complex_script", filtro_path,
+        "-map", "[vout]", "-map", f"{indice_audio}:a",
+        "-r", str(fps), "-t", f"{duracion_total:.6f}",
+        "-c:v", codec, "-preset", preset, "-threads", str(threads),
+    ]
+    if crf is not None:
+        comando += ["-crf", str(crf)]
+    comando += [
+        # A la frecuencia de la pista y en estéreo, igual que render_moviepy
+        "-c:a", audio_codec, *stereo_output_args(pista_audio.nchannels),
+        "-progress", "pipe:1", "-nostats",
+        output_path,
+    ]
+    return comando
+
+
+def _write_stdin(proc, datos):
+    try:
+        proc.stdin.write(datos)
+    except (BrokenPipeError, ValueError):
+        pass  # ffmpeg terminó (o se canceló) antes de leer todo el audio
+    finally:
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+
+
+def render_ffmpeg(background_video_path, pista_audio, segmentos, output_path, video_size, fps=24, progress=None,
+                  trace=None, **encode_kwargs):
+    """
+    Renderiza el mismo video que render_moviepy con una sola invocación de ffmpeg,
+    sin pasar los fotogramas por el bucle de Python de moviepy.
+    El progreso se lee de la salida de -progress de ffmpeg.
+    """
+    if trace is None:
+        trace = RenderTrace()
+    temp_dir = tempfile.mkdtemp(prefix="ffmpeg_render_")
+    try:
+        rutas_overlays = []
+        with trace.span("overlays_png", subtitulos=len(segmentos)):
+            for i, (_, overlay) in enumerate(segmentos):
+                ruta = os.path.join(temp_dir, f"subtitulo_{i:05d}.png")
+                Image.fromarray(overlay).save(ruta, compress_level=1)
+                rutas_overlays.append(ruta)
+
+        comando = build_ffmpeg_command(background_video_path, pista_audio, segmentos, output_path, rutas_overlays,
+                                       os.path.join(temp_dir, "filtro.txt"), video_size, fps=fps, **encode_kwargs)
+        logging.info(f"Renderizando con ffmpeg: {len(segmentos)} subtítulos")
+        total_fotogramas = int(pista_audio.duration * fps)
+        with trace.span("codificacion", backend="ffmpeg"):
+            proc = subprocess.Popen(comando, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            # El audio se escribe y stderr se drena en hilos aparte para no bloquear la lectura del progreso
+            stderr = []
+            hilos = [threading.Thread(target=_write_stdin, args=(proc, pista_audio.to_bytes()), daemon=True),
+                     threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)]
+            for hilo in hilos:
+                hilo.start()
+            try:
+                for linea in proc.stdout:
+                    if progress is not None and linea.startswith(b"frame="):
+                        progress("codificacion", min(int(linea[6:]), total_fotogramas), total_fotogramas)
+            except BaseException:
+                proc.kill()
+                raise
+            finally:
+                proc.wait()
+                for hilo in hilos:
+                    hilo.join()
+        if proc.returncode != 0:
+            mensaje = b"".join(stderr).decode("utf-8", errors="replace").strip()
+            raise Exception(f"Error de ffmpeg ({proc.returncode}): {mensaje}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
@@ -0,0 +1,76 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Configuración predeterminada de los resultados retenidos en memoria
+RETENCION_EN_MEMORIA = int(os.environ.get("RESULTS_MEMORY_TTL", 10 * 60))  # Segundos sin mostrarse
+TAMANO_MAXIMO_RESULTADOS = int(os.environ.get("RESULTS_MEMORY_BYTES", 512 * 1024 * 1024))
+
+
+class ResultStore:
+    """
+    Videos terminados retenidos en memoria para mostrarlos y descargarlos.
+
+    Cada archivo se lee de disco una sola vez y el mismo objeto bytes se entrega a st.video y
+    a st.download_button en todas las sesiones y reruns, así que volver a mostrar un resultado
+    no lo relee ni lo duplica. Las entradas caducan tras `ttl` segundos sin usarse y se expulsan
+    las menos usadas recientemente (LRU) cuando se supera `max_bytes`; el archivo sigue en disco.
+    """
+
+    def __init__(self, ttl=RETENCION_EN_MEMORIA, max_bytes=TAMANO_MAXIMO_RESULTADOS):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # ruta -> (datos, último acceso), de menos a más reciente
+        self._total_bytes = 0
+
+    def get(self, path):
+        """Devuelve el contenido del archivo, leyéndolo de disco solo si no está retenido."""
+        with self._lock:
+            self._purgar(time.monotonic())
+            entrada = self._entradas.get(path)
+            if entrada is not None:
+                self._entradas[path] = (entrada[0], time.monotonic())
+                self._entradas.move_to_end(path)
+                return entrada[0]
+
+        # La lectura (cientos de MB) se hace sin el lock para no bloquear las demás sesiones
+        with open(path, "rb") as f:
+            datos = f.read()  # Una sola reserva: el tamaño se conoce por fstat
+
+        with self._lock:
+            entrada = self._entradas.pop(path, None)
+            if entrada is not None:
+                datos = entrada[0]  # Otra sesión lo leyó a la vez: se entrega el mismo objeto
+            else:
+                self._total_bytes += len(datos)
+                logging.info(f"Resultado retenido en memoria: {path} ({len(datos) / 2 ** 20:.1f} MB)")
+            self._entradas[path] = (datos, time.monotonic())
+            self._expulsar()
+            return datos
+
+    def purge(self):
+        """Libera las entradas caducadas; `get` solo purga cuando alguien lee un resultado."""
+        with self._lock:
+            self._purgar(time.monotonic())
+
+    def discard(self, path):
+        with self._lock:
+            self._quitar(path)
+
+    def _quitar(self, path):
+        entrada = self._entradas.pop(path, None)
+        if entrada is not None:
+            self._total_bytes -= len(entrada[0])
+
+    def _purgar(self, ahora):
+        caducadas = [ruta for ruta, (_, acceso) in self._entradas.items() if ahora - acceso > self.ttl]
+        for ruta in caducadas:
+            self._quitar(ruta)
+
+    def _expulsar(self):
+        # Siempre se conserva la entrada más reciente, aunque por sí sola supere el límite
+        while self._total_bytes > self.max_bytes and len(self._entradas) > 1:
+            self._quitar(next(iter(self._entradas)))
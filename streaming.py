@@ -0,0 +1,179 @@
+import logging
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+
+from moviepy.config import get_setting
+import numpy as np
+
+from audio import FRECUENCIA_MUESTREO, decode_linear16, stereo_output_args
+from background import MEMORIA_MAXIMA_FONDO, LoopingBackgroundClip
+from compositor import SubtitleCompositor
+from profiling import RenderTrace
+from render import FrameProgressLogger
+from text_render import render_overlays
+
+SEGMENTOS_POR_FRAGMENTO = 4
+
+
+def concat_chunks(rutas_fragmentos, output_path, temp_dir, pcm_path, sample_rate, channels, audio_codec='aac'):
+    """
+    Une los fragmentos de video con el demuxer concat de ffmpeg, sin recodificarlos, y les
+    añade la pista PCM completa (s16le) codificada una sola vez. Los fragmentos no llevan
+    audio: cada AAC por fragmento añadiría su propio relleno inicial y final en cada unión.
+    """
+    lista = os.path.join(temp_dir, "fragmentos.txt")
+    with open(lista, "w") as f:
+        for ruta in rutas_fragmentos:
+            f.write(f"file '{ruta}'\n")
+
+    comando = [
+        get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+        "-f", "concat", "-safe", "0", "-i", lista,
+        "-f", "s16le", "-ar", str(sample_rate), "-ac", str(channels), "-i", pcm_path,
+        "-map", "0:v", "-map", "1:a",
+        "-c:v", "copy", "-c:a", audio_codec, *stereo_output_args(channels), "-movflags", "+faststart",
+        output_path,
+    ]
+    resultado = subprocess.run(comando, capture_output=True, text=True)
+    if resultado.returncode != 0:
+        raise Exception(f"Error al concatenar los fragmentos: {resultado.stderr.strip()}")
+
+
+class StreamingRenderer:
+    """
+    Codifica el video por fragmentos a medida que llega el audio de cada grupo de segmentos.
+
+    Los fragmentos son solo video y sus límites se alinean a la rejilla de fotogramas; un
+    segmento que cruza el límite aparece en ambos fragmentos, cada uno con su parte. El audio
+    se va añadiendo como PCM a un archivo temporal y se codifica una sola vez al unir los
+    fragmentos, así no hay huecos en las uniones ni deriva con la longitud del guion. Tras
+    escribir un fragmento se cierran sus clips, así la memoria no depende del guion.
+    """
+
+    def __init__(self, background_video_path, output_path, fps=24, segments_per_chunk=SEGMENTOS_POR_FRAGMENTO,
+                 background_memory_cap=MEMORIA_MAXIMA_FONDO, progress=None, trace=None, max_height=None, crf=None,
+                 **write_kwargs):
+        self.output_path = output_path
+        self.fps = fps
+        self.segments_per_chunk = max(1, segments_per_chunk)
+        if crf is not None:
+            write_kwargs["ffmpeg_params"] = ["-crf", str(crf)]
+        self.audio_codec = write_kwargs.pop("audio_codec", "aac")
+        self.write_kwargs = write_kwargs
+        self.progress = progress
+        self.trace = trace if trace is not None else RenderTrace()
+        self._fotogramas = 0  # Fotogramas ya codificados en fragmentos anteriores
+
+        self.temp_dir = tempfile.mkdtemp(prefix="render_")
+        # Un solo fondo en bucle para todo el render; cada fragmento toma un subclip de él
+        with self.trace.span("apertura_fondo"):
+            self.background_clip = LoopingBackgroundClip(background_video_path, max_cache_bytes=background_memory_cap,
+                                                         max_height=max_height)
+        self.video_width, self.video_height = self.background_clip.size
+
+        # (muestra_inicial, número de muestras, overlay) de los segmentos aún no cubiertos por completo
+        self._pendientes = []
+        # Pista de audio completa en PCM s16le, escrita a medida que llegan los segmentos
+        self._ruta_audio = os.path.join(self.temp_dir, "audio.pcm")
+        self._archivo_audio = open(self._ruta_audio, "wb")
+        self._canales = None
+        self._sample_rate = None
+        self._nuevos = 0
+        self._inicio_fragmento = 0.0
+        self._muestras_acumuladas = 0
+        self._fragmentos = []
+
+    @property
+    def _tiempo_acumulado(self):
+        return self._muestras_acumuladas / (self._sample_rate or FRECUENCIA_MUESTREO)
+
+    def add_segment(self, texto, segmento_audio):
+        """Añade el siguiente segmento (en orden) y codifica un fragmento si el grupo está completo."""
+        muestras, sample_rate = decode_linear16(segmento_audio.audio_content)
+        if self._sample_rate is None:
+            self._sample_rate = sample_rate
+        elif sample_rate != self._sample_rate:
+            raise Exception(f"Frecuencia de muestreo inesperada: {sample_rate} Hz (se esperaba {self._sample_rate} Hz)")
+        if self._canales is None:
+            self._canales = muestras.shape[1]
+        elif muestras.shape[1] != self._canales:
+            raise Exception(f"Número de canales inesperado: {muestras.shape[1]} (se esperaba {self._canales})")
+
+        with self.trace.span("rasterizado"):
+            overlay = render_overlays([texto], self.video_width, self.video_height)[0]
+        self._archivo_audio.write(np.ascontiguousarray(muestras).tobytes())
+        self._pendientes.append((self._muestras_acumuladas, len(muestras), overlay))
+        self._muestras_acumuladas += len(muestras)
+        self._nuevos += 1
+
+        if self._nuevos >= self.segments_per_chunk:
+            # Cortar en el último fotograma completo; el resto pasa al siguiente fragmento
+            self._write_chunk(math.floor(self._tiempo_acumulado * self.fps) / self.fps)
+
+    def finish(self):
+        """Codifica lo que quede y une todos los fragmentos en `output_path`."""
+        fin = math.ceil(self._tiempo_acumulado * self.fps) / self.fps
+        if fin > self._inicio_fragmento:
+            self._write_chunk(fin)
+        self._archivo_audio.close()
+        logging.info(f"Uniendo {len(self._fragmentos)} fragmentos en {self.output_path}")
+        with self.trace.span("concatenacion", fragmentos=len(self._fragmentos)):
+            concat_chunks(self._fragmentos, self.output_path, self.temp_dir, self._ruta_audio,
+                          self._sample_rate, self._canales, audio_codec=self.audio_codec)
+        self.trace.count("reaperturas_fondo", self.background_clip.reopens)
+        return self._tiempo_acumulado
+
+    def _write_chunk(self, fin_fragmento):
+        inicio_fragmento = self._inicio_fragmento
+        if fin_fragmento <= inicio_fragmento:
+            return
+        fondo = self.background_clip.set_duration(fin_fragmento).subclip(inicio_fragmento, fin_fragmento)
+
+        # Subtítulos de los segmentos que caen en las muestras [muestra0, muestra1)
+        sample_rate = self._sample_rate
+        muestra0 = round(inicio_fragmento * sample_rate)
+        muestra1 = round(fin_fragmento * sample_rate)
+        linea_tiempo = []
+        for inicio_muestras, num_muestras, overlay in self._pendientes:
+            fin_muestras = inicio_muestras + num_muestras
+            if fin_muestras <= muestra0 or inicio_muestras >= muestra1:
+                continue
+            linea_tiempo.append((inicio_muestras / sample_rate - inicio_fragmento,
+                                 fin_muestras / sample_rate - inicio_fragmento, overlay))
+
+        compositor = SubtitleCompositor(linea_tiempo, (self.video_width, self.video_height))
+        fragmento = compositor.apply(fondo, self.trace)
+
+        ruta = os.path.join(self.temp_dir, f"fragmento_{len(self._fragmentos):05d}.mp4")
+        logging.info(f"Codificando fragmento {len(self._fragmentos) + 1}: {inicio_fragmento:.2f}s - {fin_fragmento:.2f}s")
+        write_kwargs = dict(self.write_kwargs)
+        if self.progress is not None:
+            # El total de fotogramas no se conoce hasta que termina la síntesis
+            progreso = lambda etapa, actual, total: self.progress(etapa, actual, None)
+            write_kwargs["logger"] = FrameProgressLogger(progreso, offset=self._fotogramas)
+        with self.trace.span("codificacion", fragmento=len(self._fragmentos) + 1), self.trace.profile_frames():
+            fragmento.write_videofile(
+                ruta,
+                fps=self.fps,
+                audio=False,
+                **write_kwargs
+            )
+        self._fragmentos.append(ruta)
+        self._fotogramas += round((fin_fragmento - inicio_fragmento) * self.fps)
+
+        # Liberar los segmentos que ya quedaron cubiertos por completo
+        self._pendientes = [entrada for entrada in self._pendientes if entrada[0] + entrada[1] > muestra1]
+        self._inicio_fragmento = fin_fragmento
+        self._nuevos = 0
+
+    def close(self):
+        self._pendientes = []
+        self._archivo_audio.close()
+        try:
+            self.background_clip.close()
+        except Exception:
+            pass
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
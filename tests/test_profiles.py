@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from profiles import PERFILES_RENDER, target_size
+
+
+@pytest.mark.parametrize("perfil, tamano_fondo, esperado", [
+    # Horizontales: el lado corto es la altura
+    ("standard", (1920, 1080), (1920, 1080)),
+    ("standard", (1280, 720), (1280, 720)),
+    ("standard", (3840, 2160), (1920, 1080)),
+    ("draft", (1920, 1080), (854, 480)),
+    # Verticales: el lado corto es el ancho y la altura se escala en proporción
+    ("standard", (1080, 1920), (1080, 1920)),
+    ("standard", (720, 1280), (720, 1280)),
+    ("standard", (2160, 3840), (1080, 1920)),
+    ("draft", (1080, 1920), (480, 854)),
+    ("draft", (720, 1280), (480, 854)),
+    # Cuadrado, impar y sin límite
+    ("draft", (1000, 1000), (480, 480)),
+    ("draft", (641, 1001), (480, 750)),
+    ("archive", (2160, 3840), (2160, 3840)),
+])
+def test_target_size_limita_el_lado_corto(perfil, tamano_fondo, esperado):
+    assert target_size(tamano_fondo, PERFILES_RENDER[perfil].max_height) == esperado
@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_text_render import create_text_image_original
+from compositor import SubtitleCompositor
+from text_render import render_overlays
+
+TEXTOS = [
+    "Hola.",
+    "Una frase de longitud media para el subtítulo del video.",
+    "Esta es una frase bastante más larga que ocupa varias líneas del subtítulo, "
+    "con palabras de distinta longitud para que cambie el ancho de cada línea del bloque.",
+]
+
+
+@pytest.mark.parametrize("tamano", [(1280, 720), (1920, 1080), (641, 361), (320, 240), (720, 1280), (1080, 1920)])
+def test_overlay_compacto_igual_que_el_original(tamano):
+    # El overlay recortado, compuesto sobre un fotograma, debe dar los mismos píxeles que el
+    # overlay a ancho completo de la implementación anterior (incluso si el texto no cabe)
+    ancho, alto = tamano
+    fondo = np.random.default_rng(0).integers(0, 256, (alto, ancho, 3), dtype=np.uint8)
+    for texto, compacto in zip(TEXTOS, render_overlays(TEXTOS, ancho, alto)):
+        original = create_text_image_original(texto, ancho, alto)
+        esperado = SubtitleCompositor([(0, 1, original)], (ancho, alto)).blend(fondo, 0)
+        obtenido = SubtitleCompositor([(0, 1, compacto)], (ancho, alto)).blend(fondo, 0)
+        assert np.array_equal(esperado, obtenido), f"{ancho}x{alto}: {texto[:20]}"
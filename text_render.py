@@ -0,0 +1,108 @@
+import textwrap
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+RUTA_FUENTE = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+ANCHO_LINEA = 60  # Caracteres máximos por línea
+
+
+@lru_cache(maxsize=32)
+def load_font(font_path, font_size):
+    """Carga cada (fuente, tamaño) una sola vez."""
+    return ImageFont.truetype(font_path, font_size)
+
+
+@lru_cache(maxsize=8192)
+def measure_line(font_path, font_size, line):
+    """Devuelve la caja (left, top, right, bottom) de una línea, igual que draw.textbbox((0, 0), ...)."""
+    return load_font(font_path, font_size).getbbox(line)
+
+
+@lru_cache(maxsize=2048)
+def rasterize_line(font_path, font_size, line):
+    """
+    Rasteriza una línea como máscara 'L' dibujada en el origen. Pegar el color del texto
+    con esta máscara equivale a draw.text en la misma posición.
+    """
+    font = load_font(font_path, font_size)
+    _, _, right, bottom = measure_line(font_path, font_size, line)
+    mascara = Image.new('L', (max(1, right), max(1, bottom)), 0)
+    ImageDraw.Draw(mascara).text((0, 0), line, font=font, fill=255)
+    return mascara
+
+
+def layout_text(text, video_width, video_height, font_size=None, line_height=None, padding=None, bottom_margin=None,
+                font_path=RUTA_FUENTE):
+    """
+    Calcula la disposición de un subtítulo: líneas, ancho de cada una y dimensiones del overlay.
+    Los valores predeterminados dependen de la resolución, como en create_text_image.
+    """
+    if font_size is None:
+        font_size = int(video_height * 0.05)  # 5% de la altura del video
+    if line_height is None:
+        line_height = int(font_size * 1.2)  # 120% del tamaño de la fuente
+    if padding is None:
+        padding = int(video_height * 0.01)  # 1% de la altura del video
+    if bottom_margin is None:
+        bottom_margin = int(video_height * 0.02)  # 2% de la altura del video
+
+    lines = textwrap.fill(text, width=ANCHO_LINEA).split('\n')
+    anchos = []
+    for line in lines:
+        left, _, right, _ = measure_line(font_path, font_size, line)
+        anchos.append(right - left)
+    max_line_width = max(anchos)
+
+    # El overlay compacto cubre solo el rectángulo de fondo más el margen inferior. Se centra
+    # con (video_width - ancho) // 2, así que cuando la paridad no cuadra se añade una columna
+    # transparente a la izquierda para que el rectángulo y el texto caigan en los mismos
+    # píxeles que con el overlay a ancho completo. Si una línea es más ancha que el video no se
+    # recorta aquí: el overlay sigue centrado y quien lo compone descarta lo que cae fuera.
+    rect_x0 = (video_width - max_line_width) // 2 - padding
+    box_width = max_line_width + 2 * padding + 1
+    desplazamiento = 1 - (video_width - max_line_width) % 2
+
+    return {
+        "lines": lines,
+        "widths": anchos,
+        "font_path": font_path,
+        "font_size": font_size,
+        "line_height": line_height,
+        "x_lines": [(video_width - w) // 2 - rect_x0 + desplazamiento for w in anchos],
+        "width": box_width + desplazamiento,
+        "box_x0": desplazamiento,
+        "box_width": box_width,
+        "height": len(lines) * line_height + padding + bottom_margin,
+        "box_height": len(lines) * line_height,
+    }
+
+
+def render_overlay(layout, bg_color=(0, 0, 0, 150), text_color="white"):
+    """
+    Dibuja un overlay RGBA recortado al bloque de texto (no al ancho completo del video).
+    Se coloca centrado y pegado al borde inferior del fotograma.
+    """
+    img = Image.new('RGBA', (layout["width"], layout["height"]), (0, 0, 0, 0))
+    box_x0 = layout["box_x0"]
+    ImageDraw.Draw(img).rectangle((box_x0, 0, box_x0 + layout["box_width"] - 1, layout["box_height"]),
+                                  fill=bg_color)
+
+    y = 0
+    for line, x in zip(layout["lines"], layout["x_lines"]):
+        mascara = rasterize_line(layout["font_path"], layout["font_size"], line)
+        img.paste(text_color, (x, y, x + mascara.width, y + mascara.height), mascara)
+        y += layout["line_height"]
+
+    return np.asarray(img)
+
+
+def render_overlays(segmentos, video_width, video_height, **kwargs):
+    """
+    Dispone y rasteriza todos los segmentos de un guion en un solo lote.
+    Las líneas repetidas entre segmentos se miden y rasterizan una sola vez.
+    """
+    estilo = {k: kwargs.pop(k) for k in ("bg_color", "text_color") if k in kwargs}
+    layouts = [layout_text(segmento, video_width, video_height, **kwargs) for segmento in segmentos]
+    return [render_overlay(layout, **estilo) for layout in layouts]
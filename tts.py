@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from google.cloud import texttospeech
+
+from audio import linear16_duration
+from profiling import RenderTrace
+
+# Valores predeterminados de la etapa de síntesis
+MAX_SOLICITUDES_CONCURRENTES = 4  # Solicitudes TTS en vuelo a la vez
+SOLICITUDES_POR_SEGUNDO = 5  # Equivale al antiguo time.sleep(0.2) entre segmentos
+MAX_REINTENTOS = 3
+
+# Resultado de sintetizar un segmento. `duracion` se calcula de la cabecera WAV (o viene de la
+# caché); `clave` es la clave de caché (None si no hay caché).
+SegmentoAudio = namedtuple("SegmentoAudio", ["audio_content", "duracion", "clave"])
+
+
+class TokenBucket:
+    """
+    Limitador de tasa de tipo token bucket, compartido entre todos los hilos de síntesis.
+    Cada solicitud (incluidos los reintentos) consume un token.
+    """
+
+    def __init__(self, rate=SOLICITUDES_POR_SEGUNDO, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1, rate))
+        self._tokens = self.capacity
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (ahora - self._ultimo) * self.rate)
+                self._ultimo = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.rate
+            time.sleep(espera)
+
+
+def synthesize_with_retry(client, texto, voice, audio_config, rate_limiter=None, max_retries=MAX_REINTENTOS,
+                          trace=None):
+    """
+    Sintetiza un segmento aplicando backoff exponencial cuando la API responde 429.
+    En `trace` se registran la espera del limitador, cada solicitud, los reintentos y las esperas de backoff.
+    """
+    if trace is None:
+        trace = RenderTrace()
+    synthesis_input = texttospeech.SynthesisInput(text=texto)
+    retry_count = 0
+
+    while retry_count <= max_retries:
+        if rate_limiter is not None:
+            inicio = time.perf_counter()
+            rate_limiter.acquire()
+            trace.add_time("espera_limite_tasa", time.perf_counter() - inicio)
+        try:
+            with trace.span("tts_solicitud", category="tts", intento=retry_count + 1):
+                return client.synthesize_speech(
+                    input=synthesis_input,
+                    voice=voice,
+                    audio_config=audio_config
+                )
+        except Exception as e:
+            logging.error(f"Error al solicitar audio (intento {retry_count + 1}): {str(e)}")
+            if "429" in str(e):
+                retry_count += 1
+                trace.count("tts_reintentos")
+                with trace.span("tts_backoff", category="tts", segundos=2 ** retry_count):
+                    time.sleep(2 ** retry_count)
+            else:
+                trace.count("tts_errores")
+                raise
+
+    raise Exception("Maximos intentos de reintento alcanzado")
+
+
+def iter_synthesized_segments(client, segmentos, voice, audio_config, max_workers=MAX_SOLICITUDES_CONCURRENTES,
+                               rate_limiter=None, max_retries=MAX_REINTENTOS, cache=None, trace=None):
+    """
+    Sintetiza los segmentos con un máximo de `max_workers` solicitudes en vuelo y va
+    devolviendo cada SegmentoAudio, en el orden de `segmentos`, en cuanto está listo.
+    Los segmentos presentes en `cache` no llegan a la API ni consumen tokens, y cada segmento
+    sintetizado se guarda en ella en cuanto llega: si otro segmento falla o el render se cancela,
+    los ya pagados no se vuelven a pedir.
+    Solo se adelantan 2 * `max_workers` segmentos, así la memoria no crece con el guion.
+    Cada segmento queda en `trace` como un intervalo de categoría "segmento".
+    """
+    if rate_limiter is None:
+        rate_limiter = TokenBucket()
+    if trace is None:
+        trace = RenderTrace()
+
+    def sintetizar(i, segmento):
+        with trace.span(f"segmento {i + 1}", category="segmento", caracteres=len(segmento)) as args:
+            clave = None
+            if cache is not None:
+                clave = cache.key(segmento, voice, audio_config)
+                en_cache = cache.get(clave)
+                args["cache"] = en_cache is not None
+                if en_cache is not None:
+                    trace.count("cache_aciertos")
+                    logging.info(f"Segmento {i + 1} de {len(segmentos)} recuperado de la caché")
+                    return SegmentoAudio(en_cache[0], en_cache[1], clave)
+                trace.count("cache_fallos")
+
+            logging.info(f"Sintetizando segmento {i + 1} de {len(segmentos)}")
+            response = synthesize_with_retry(client, segmento, voice, audio_config,
+                                             rate_limiter=rate_limiter, max_retries=max_retries, trace=trace)
+            trace.count("tts_solicitudes")
+            duracion = linear16_duration(response.audio_content)
+            if cache is not None:
+                cache.put(clave, response.audio_content, duracion)
+            return SegmentoAudio(response.audio_content, duracion, clave)
+
+    max_workers = max(1, max_workers)
+    pendientes = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for i, segmento in enumerate(segmentos):
+                pendientes.append(executor.submit(sintetizar, i, segmento))
+                if len(pendientes) >= 2 * max_workers:
+                    yield pendientes.popleft().result()
+            while pendientes:
+                yield pendientes.popleft().result()
+        finally:
+            # Si el consumidor se detiene (o hay un error), no se lanzan más solicitudes
+            for futuro in pendientes:
+                futuro.cancel()
+
+
+def synthesize_segments(client, segmentos, voice, audio_config, **kwargs):
+    """
+    Sintetiza todos los segmentos y devuelve una lista de SegmentoAudio en el orden de `segmentos`.
+    Acepta los mismos argumentos que iter_synthesized_segments.
+    """
+    return list(iter_synthesized_segments(client, segmentos, voice, audio_config, **kwargs))
@@ -0,0 +1,223 @@
+import logging
+import tempfile
+
+from google.cloud import texttospeech
+from moviepy.editor import VideoFileClip
+
+from audio import FRECUENCIA_MUESTREO, AudioTrack, decode_linear16
+from audio_cache import AudioCache
+from background import MEMORIA_MAXIMA_FONDO
+from profiles import PERFIL_PREDETERMINADO, encoder_threads, get_profile, target_size
+from profiling import RenderTrace
+from render import BACKENDS, render_ffmpeg, render_moviepy
+from streaming import SEGMENTOS_POR_FRAGMENTO, StreamingRenderer
+from text_render import render_overlays
+from tts import MAX_SOLICITUDES_CONCURRENTES, SOLICITUDES_POR_SEGUNDO, TokenBucket, iter_synthesized_segments
+
+# Configuración de voces
+VOCES_DISPONIBLES = {
+    'es-ES-Standard-B': texttospeech.SsmlVoiceGender.MALE,
+}
+
+# Caché persistente de segmentos de audio compartida por todas las sesiones
+CACHE_AUDIO = AudioCache()
+
+# Función de creación de texto con fondo
+def create_text_image(text, video_width, video_height, font_size=None, line_height=None, bg_color=(0, 0, 0, 150), text_color="white", padding=None, bottom_margin=None):
+    """
+    Crea una imagen con texto y un fondo oscuro transparente, optimizada para la parte inferior del video.
+    La imagen se recorta al bloque de texto; la fuente y las líneas rasterizadas se reutilizan entre llamadas.
+    """
+    return render_overlays([text], video_width, video_height, font_size=font_size, line_height=line_height,
+                           padding=padding, bottom_margin=bottom_margin, bg_color=bg_color,
+                           text_color=text_color)[0]
+
+# Función de creación de video
+def create_simple_video(texto, nombre_salida, voz, background_video_path, tts_client=None,
+                        max_concurrent_tts=MAX_SOLICITUDES_CONCURRENTES, tts_rate=SOLICITUDES_POR_SEGUNDO,
+                        audio_cache=CACHE_AUDIO, streaming=False, segments_per_chunk=SEGMENTOS_POR_FRAGMENTO,
+                        backend="moviepy", background_memory_cap=MEMORIA_MAXIMA_FONDO, progress=None,
+                        output_dir=None, trace=None, profile=PERFIL_PREDETERMINADO, threads=None):
+    """
+    Genera el video y devuelve (success, message, ruta_del_video).
+    `profile` elige resolución máxima, fps y ajustes de x264 (ver profiles.PERFILES_RENDER);
+    `threads` son los hilos del codificador (por defecto, según los núcleos disponibles).
+    `progress(etapa, actual, total)` recibe el avance de las etapas "sintesis" y "codificacion";
+    si lanza una excepción el render se interrumpe. El video se escribe en `output_dir`
+    (por defecto, el directorio temporal del sistema).
+    Los tiempos de cada etapa y segmento, los contadores y la memoria se registran en `trace` (un RenderTrace).
+    """
+    success = False
+    message = ""
+    temp_video_path = None
+    renderer = None
+    if trace is None:
+        trace = RenderTrace()
+
+    try:
+        trace.start()
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend de render desconocido: {backend}")
+        if streaming and backend != "moviepy":
+            raise ValueError("El modo streaming solo admite el backend moviepy")
+        perfil = get_profile(profile)
+        if threads is None:
+            threads = encoder_threads()
+        logging.info(f"Perfil de render {profile}: {perfil}, {threads} hilos de codificación")
+
+        logging.info("Iniciando proceso de creación de video...")
+        frases = [f.strip() + "." for f in texto.split('.') if f.strip()]
+        # El cliente TTS es inyectable (p. ej. un cliente falso para benchmarks)
+        client = tts_client if tts_client is not None else texttospeech.TextToSpeechClient()
+
+        # Agrupamos frases en segmentos
+        segmentos_texto = []
+        segmento_actual = ""
+        for frase in frases:
+            if len(segmento_actual) + len(frase) < 250:  # Reducido a 250
+                segmento_actual += " " + frase
+            else:
+                segmentos_texto.append(segmento_actual.strip())
+                segmento_actual = frase
+        segmentos_texto.append(segmento_actual.strip())
+
+        voice = texttospeech.VoiceSelectionParams(
+            language_code="es-ES",
+            name=voz,
+            ssml_gender=VOCES_DISPONIBLES[voz]
+        )
+        # PCM en memoria: la duración sale del número de muestras, sin decodificar
+        audio_config = texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.LINEAR16,
+            sample_rate_hertz=FRECUENCIA_MUESTREO
+        )
+
+        if streaming:
+            # Codificar por fragmentos mientras se sintetizan los segmentos siguientes
+            with tempfile.NamedTemporaryFile(suffix=".mp4", dir=output_dir, delete=False) as temp_video_file:
+                temp_video_path = temp_video_file.name
+            logging.info(f"Escribiendo video por fragmentos a: {temp_video_path}")
+            renderer = StreamingRenderer(
+                background_video_path, temp_video_path,
+                fps=perfil.fps,
+                segments_per_chunk=segments_per_chunk,
+                background_memory_cap=background_memory_cap,
+                progress=progress,
+                trace=trace,
+                max_height=perfil.max_height,
+                crf=perfil.crf,
+                codec='libx264',
+                audio_codec='aac',
+                preset=perfil.preset,
+                threads=threads
+            )
+            segmentos_audio = iter_synthesized_segments(
+                client, segmentos_texto, voice, audio_config,
+                max_workers=max_concurrent_tts,
+                rate_limiter=TokenBucket(tts_rate),
+                cache=audio_cache,
+                trace=trace
+            )
+            for i, (segmento, segmento_audio) in enumerate(zip(segmentos_texto, segmentos_audio)):
+                if progress is not None:
+                    progress("sintesis", i + 1, len(segmentos_texto))
+                renderer.add_segment(segmento, segmento_audio)
+            renderer.finish()
+            logging.info("Video escrito exitosamente al archivo temporal.")
+        else:
+            # Cargar video de fondo
+            try:
+                logging.info(f"Intentando cargar video de fondo desde: {background_video_path}")
+                with trace.span("sondeo_fondo"):
+                    background_clip = VideoFileClip(background_video_path, audio=False)
+                logging.info("Video de fondo cargado exitosamente.")
+                video_width, video_height = background_clip.size  # Obtener dimensiones del video
+                logging.info(f"Ancho del video: {video_width}, Alto del video: {video_height}") # Imprime la resolución
+                background_clip.close()  # El backend de render abre el fondo por su cuenta
+                # Los subtítulos se dimensionan para la resolución de salida, no la del fondo
+                video_width, video_height = target_size((video_width, video_height), perfil.max_height)
+            except Exception as e:
+                message = f"Error al cargar el video de fondo: {e}"
+                logging.error(message)
+                return False, message, None
+
+            # Sintetizar todos los segmentos de forma concurrente; las respuestas vuelven en orden
+            respuestas = []
+            with trace.span("sintesis", segmentos=len(segmentos_texto)):
+                for segmento_audio in iter_synthesized_segments(
+                        client, segmentos_texto, voice, audio_config,
+                        max_workers=max_concurrent_tts,
+                        rate_limiter=TokenBucket(tts_rate),
+                        cache=audio_cache,
+                        trace=trace):
+                    respuestas.append(segmento_audio)
+                    if progress is not None:
+                        progress("sintesis", len(respuestas), len(segmentos_texto))
+
+            # Disponer y rasterizar todos los subtítulos en un solo lote
+            with trace.span("rasterizado", segmentos=len(segmentos_texto)):
+                overlays = render_overlays(segmentos_texto, video_width, video_height)
+
+            # Unir todo el audio en un único búfer; las duraciones salen del número de muestras
+            segmentos_pcm = []
+            sample_rate = FRECUENCIA_MUESTREO
+            with trace.span("audio"):
+                for segmento_audio in respuestas:
+                    muestras, sample_rate = decode_linear16(segmento_audio.audio_content)
+                    segmentos_pcm.append(muestras)
+                pista_audio, duraciones = AudioTrack.from_segments(segmentos_pcm, sample_rate)
+            segmentos_pcm = None
+            segmentos_render = list(zip(duraciones, overlays))  # (duracion, overlay) por segmento
+
+            if audio_cache is not None:
+                stats = audio_cache.stats()
+                logging.info(f"Caché de audio: {stats['hits']} aciertos, {stats['misses']} fallos")
+
+            # Generar el video en un archivo temporal
+            with tempfile.NamedTemporaryFile(suffix=".mp4", dir=output_dir, delete=False) as temp_video_file:
+                temp_video_path = temp_video_file.name
+            logging.info(f"Escribiendo video a archivo temporal con el backend {backend}: {temp_video_path}")
+            if backend == "ffmpeg":
+                render_ffmpeg(
+                    background_video_path, pista_audio, segmentos_render, temp_video_path,
+                    video_size=(video_width, video_height),
+                    fps=perfil.fps,
+                    progress=progress,
+                    trace=trace,
+                    codec='libx264',
+                    audio_codec='aac',
+                    preset=perfil.preset,
+                    threads=threads,
+                    crf=perfil.crf
+                )
+            else:
+                render_moviepy(
+                    background_video_path, pista_audio, segmentos_render, temp_video_path,
+                    fps=perfil.fps,
+                    background_memory_cap=background_memory_cap,
+                    progress=progress,
+                    trace=trace,
+                    max_height=perfil.max_height,
+                    crf=perfil.crf,
+                    codec='libx264',
+                    audio_codec='aac',
+                    preset=perfil.preset,
+                    threads=threads
+                )
+            logging.info("Video escrito exitosamente al archivo temporal.")
+
+        success = True
+        message = "Video generado exitosamente"
+
+    except Exception as e:
+        message = str(e)
+        logging.error(f"Error: {message}")
+        success = False
+
+    finally:
+        if renderer is not None:
+            renderer.close()
+        trace.stop()
+        logging.info(f"Perfil del render: {trace.summary()}")
+
+        return success, message, temp_video_path